@@ -0,0 +1,330 @@
+#! /usr/bin/env python
+
+from hashlib import blake2b
+from weakref import WeakValueDictionary
+
+import numpy as np
+
+
+class BitSet():
+    """ BitSet class
+
+    Immutable set of non-negative integers, such as entity IDs. Each set is
+    stored either as a sorted array or as a packed bitmap, whichever takes
+    the least memory, such that sparse and dense sets are both compact.
+    Intersections, unions, and differences are vectorized: word-parallel on
+    bitmaps and merge-based on arrays.
+
+    Supports the common (frozen)set operations, also with Python sets as
+    other operand. Equal sets can be hash-consed with intern(), such that
+    extents shared by many clauses are stored only once.
+    """
+    # not necessary, just a memory optimization
+    __slots__ = ['_array', '_bitmap', '_len', '_hash', '__weakref__']
+
+    def __init__(self, values=()):
+        if isinstance(values, BitSet):
+            self._array = values._array
+            self._bitmap = values._bitmap
+            self._len = values._len
+            self._hash = values._hash
+
+            return
+
+        if isinstance(values, np.ndarray):
+            array = values.astype(np.uint64)
+        else:
+            if not hasattr(values, '__len__'):
+                values = list(values)
+
+            array = np.fromiter(values, dtype=np.uint64, count=len(values))
+
+        self._set_array(_unique(array))
+
+    def _set_array(self, array):
+        # array must be sorted and unique
+        self._array = None
+        self._bitmap = None
+        self._len = len(array)
+        self._hash = None
+
+        if self._len <= 0:
+            self._array = _EMPTY
+            return
+
+        upper = int(array[-1])
+        if 8 * (upper // 64 + 1) < 4 * self._len:
+            self._bitmap = _to_bitmap(array, upper // 64 + 1)
+        else:
+            self._array = array.astype(np.uint32 if upper < 2**32
+                                       else np.uint64, copy=False)
+
+    def _set_bitmap(self, bitmap):
+        # drop trailing empty words
+        nonzero = np.flatnonzero(bitmap)
+        if len(nonzero) <= 0:
+            self._set_array(_EMPTY)
+            return
+
+        bitmap = bitmap[:nonzero[-1] + 1]
+        num_bits = int(np.unpackbits(bitmap.view(np.uint8)).sum())
+        if 8 * len(bitmap) < 4 * num_bits:
+            self._array = None
+            self._bitmap = bitmap
+            self._len = num_bits
+            self._hash = None
+        else:
+            self._set_array(_to_array(bitmap))
+
+    def _as_array(self):
+        if self._bitmap is not None:
+            return _to_array(self._bitmap)
+
+        return self._array
+
+    def _as_bitmap(self, num_words):
+        if self._bitmap is not None:
+            if len(self._bitmap) >= num_words:
+                return self._bitmap[:num_words]
+
+            return np.concatenate([self._bitmap,
+                                   np.zeros(num_words - len(self._bitmap),
+                                            dtype=_WORD)])
+
+        return _to_bitmap(self._array, num_words)
+
+    def _num_words(self):
+        if self._bitmap is not None:
+            return len(self._bitmap)
+        if self._len <= 0:
+            return 0
+
+        return int(self._array[-1]) // 64 + 1
+
+    def _mask(self, array):
+        # membership of each value in array
+        if self._bitmap is None:
+            return np.isin(array, self._array, assume_unique=True)
+
+        array = array.astype(np.uint64, copy=False)
+        words = array >> np.uint64(6)
+        inside = words < len(self._bitmap)
+
+        mask = np.zeros(len(array), dtype=bool)
+        mask[inside] = (self._bitmap[words[inside]] >>
+                        (array[inside] & np.uint64(63))) & np.uint64(1) == 1
+
+        return mask
+
+    def intersection(self, other):
+        other = _bitset(other)
+        if self._len <= 0 or other._len <= 0:
+            return BitSet()
+
+        result = BitSet.__new__(BitSet)
+        if self._bitmap is not None and other._bitmap is not None:
+            n = min(len(self._bitmap), len(other._bitmap))
+            result._set_bitmap(self._bitmap[:n] & other._bitmap[:n])
+        elif self._bitmap is not None:
+            result._set_array(other._array[self._mask(other._array)])
+        elif other._bitmap is not None:
+            result._set_array(self._array[other._mask(self._array)])
+        else:
+            result._set_array(np.intersect1d(self._array, other._array,
+                                             assume_unique=True))
+
+        return result
+
+    def union(self, other):
+        other = _bitset(other)
+        if other._len <= 0:
+            return self
+        if self._len <= 0:
+            return other
+
+        result = BitSet.__new__(BitSet)
+        n = max(self._num_words(), other._num_words())
+        if 8 * n < 4 * (self._len + other._len):
+            result._set_bitmap(self._as_bitmap(n) | other._as_bitmap(n))
+        else:
+            result._set_array(np.union1d(self._as_array(), other._as_array()))
+
+        return result
+
+    def difference(self, other):
+        other = _bitset(other)
+        if self._len <= 0 or other._len <= 0:
+            return self
+
+        result = BitSet.__new__(BitSet)
+        if self._bitmap is None:
+            result._set_array(self._array[~other._mask(self._array)])
+        else:
+            n = len(self._bitmap)
+            result._set_bitmap(self._bitmap & ~other._as_bitmap(n))
+
+        return result
+
+    def isdisjoint(self, other):
+        return len(self.intersection(other)) <= 0
+
+    def issubset(self, other):
+        return len(self.difference(other)) <= 0
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __rand__(self, other):
+        return self.intersection(other)
+
+    def __ror__(self, other):
+        return self.union(other)
+
+    def __rsub__(self, other):
+        return _bitset(other).difference(self)
+
+    def __le__(self, other):
+        return self.issubset(other)
+
+    def __contains__(self, value):
+        if not isinstance(value, (int, np.integer)) or value < 0:
+            return False
+        value = int(value)
+
+        if self._bitmap is not None:
+            word = value >> 6
+            return word < len(self._bitmap) and\
+                    int(self._bitmap[word]) >> (value & 63) & 1 == 1
+
+        i = np.searchsorted(self._array, value)
+        return i < self._len and int(self._array[i]) == value
+
+    def __iter__(self):
+        return iter(self._as_array().tolist())
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __eq__(self, other):
+        if not isinstance(other, BitSet):
+            return NotImplemented
+
+        # representations are canonical
+        if self._len != other._len:
+            return False
+        if self._bitmap is not None:
+            return other._bitmap is not None and\
+                    np.array_equal(self._bitmap, other._bitmap)
+
+        return other._array is not None and\
+                np.array_equal(self._array, other._array)
+
+    def __hash__(self):
+        if self._hash is None:
+            # representations are canonical, so hash the one we have
+            if self._bitmap is not None:
+                self._hash = hash((True, self._bitmap.tobytes()))
+            else:
+                self._hash = hash(self._array.astype(np.uint64).tobytes())
+
+        return self._hash
+
+    def __reduce__(self):
+        return (_interned_bitset, (self._as_array(),))
+
+    def __repr__(self):
+        return "BitSet({})".format(self._as_array().tolist())
+
+    def array(self):
+        """ Return the members as sorted array, not to be modified """
+        return self._as_array()
+
+    def intern(self):
+        """ Return the canonical instance of this set
+
+        Equal sets which are interned share a single instance. The intern
+        table only holds weak references, such that sets which are no longer
+        used by any clause are freed as usual.
+        """
+        key = (self._len, hash(self))
+        canonical = _interned.get(key)
+        if canonical is None:
+            _interned[key] = self
+
+            return self
+        if canonical is self or canonical == self:
+            return canonical
+
+        # hash collision: leave as is
+        return self
+
+    def digest(self):
+        """ Return a 64-bit digest of the members, stable across processes """
+        data = self._as_array().astype('<u8').tobytes()
+
+        return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little')
+
+    def nbytes(self):
+        """ Return the number of bytes used to store the members """
+        if self._bitmap is not None:
+            return self._bitmap.nbytes
+
+        return self._array.nbytes
+
+
+_EMPTY = np.empty(0, dtype=np.uint32)
+_WORD = np.dtype('<u8')  # fixed byte order to match the packed bits
+_CHUNK_SIZE = 1 << 16  # values per step when building bitmaps
+_interned = WeakValueDictionary()  # (length, hash) -> BitSet
+
+def _interned_bitset(values):
+    return BitSet(values).intern()
+
+def _unique(array):
+    # sorts in place; faster than np.unique for our purposes
+    array.sort()
+    if len(array) > 1:
+        array = array[np.concatenate(([True], array[1:] != array[:-1]))]
+
+    return array
+
+def _bitset(values):
+    if isinstance(values, BitSet):
+        return values
+
+    return BitSet(values)
+
+def _to_bitmap(array, num_words):
+    # array must be sorted; values beyond the last word are left out. Bits are
+    # set in the words themselves, a chunk at a time, such that intermediate
+    # arrays stay small
+    limit = num_words * 64
+    if len(array) > 0 and int(array[-1]) >= limit:
+        array = array[:np.searchsorted(array, array.dtype.type(limit))]
+    words = np.zeros(num_words, dtype=_WORD)
+    for i in range(0, len(array), _CHUNK_SIZE):
+        chunk = array[i:i+_CHUNK_SIZE].astype(np.uint64, copy=False)
+        index = (chunk >> np.uint64(6)).astype(np.intp)
+        bits = np.left_shift(np.uint64(1), chunk & np.uint64(63))
+
+        # values of the same word are adjacent
+        starts = np.flatnonzero(np.concatenate(([True],
+                                                index[1:] != index[:-1])))
+        words[index[starts]] |= np.bitwise_or.reduceat(bits, starts)
+
+    return words
+
+def _to_array(bitmap):
+    bits = np.unpackbits(bitmap.view(np.uint8), bitorder='little')
+
+    return np.flatnonzero(bits).astype(np.uint64 if len(bits) > 2**32
+                                       else np.uint32)
@@ -1,19 +1,574 @@
 #! /usr/bin/env python
 
-from mkgfd.utils import generate_predicate_map, generate_object_type_map, generate_data_type_map
+from itertools import chain
+
+import numpy as np
+from rdflib.graph import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS, XSD
+from rdflib.store import Store
+
+from mkgfd.bitset import BitSet
+from mkgfd.utils import DictDefault, cast_xsd_array
 
 
 class Cache():
     """ Cache class
 
-    Simple wrapper around several hash maps for fast lookups.
+    Simple wrapper around several hash maps for fast lookups. If encode is
+    True, all entities, predicates, object types, and literals are replaced
+    by dense integer IDs, which can be mapped back onto their RDF terms using
+    the dictionary. Data types are kept as is as these are needed to cast
+    literals.
+
+    All maps are filled in a single pass over the triples, which can be fed
+    directly from a parser without materializing an rdflib Graph.
+
+    Sets of subjects per predicate, of instances per type, and of subjects
+    and objects per predicate and object or data type are provided as BitSet
+    on request, and kept until the underlying maps change. This requires the
+    Cache to be encoded.
+
+    The forward and backward maps of each predicate are also provided as
+    compressed sparse rows (CSR) on request, for vectorized evaluation.
+
+    Literals are likewise cast once per data type into an array of values,
+    from which the literals that satisfy a multimodal node are selected at
+    once rather than cast again on every check.
     """
     predicate_map = None
     object_type_map = None
     data_type_map = None
+    dictionary = None
+
+    _namespaces = None
+    _rdf_type = None
+    _rdfs_class = None
+    _subject_sets = None
+    _instance_sets = None
+    _predicate_type_sets = None
+    _literal_values = None
+    _literal_sets = None
+    _adjacency = None
+
+    def __init__(self, g=None, encode=True):
+        self.predicate_map = dict()
+        self.object_type_map = {'object-to-type': DictDefault(set()),
+                                'type-to-object': DictDefault(set())}
+        self.data_type_map = {'object-to-type': DictDefault(None),
+                              'type-to-object': DictDefault(set())}
+
+        self._subject_sets = dict()
+        self._instance_sets = dict()
+        self._predicate_type_sets = dict()
+        self._literal_values = dict()
+        self._literal_sets = dict()
+        self._adjacency = dict()
+
+        if encode:
+            self.dictionary = TermDictionary()
+
+        # reserve IDs for terms that might be needed even if absent
+        self._rdf_type = self.encode(RDF.type)
+        self._rdfs_class = self.encode(RDFS.Class)
+
+        # default bindings, similar to that of an rdflib Graph
+        self._namespaces = {prefix: namespace for prefix, namespace in
+                            Graph().namespaces()}
+
+        if g is not None:
+            for triple in g.triples((None, None, None)):
+                self.add(triple)
+
+            for prefix, namespace in g.namespaces():
+                self.bind(prefix, namespace)
+
+    def parse(self, source, format=None):
+        """ Parse a serialized graph and add its triples to the Cache """
+        g = Graph(store=CacheStore(self))
+        g.parse(source, format=format)
+
+        for prefix, namespace in g.namespaces():
+            self.bind(prefix, namespace)
+
+    def add(self, triple):
+        """ Add a triple of RDF terms """
+        s, p, o = triple
+        self.add_encoded((self.encode(s), self.encode(p), self.encode(o)))
+
+    def add_encoded(self, triple):
+        """ Add a triple of IDs """
+        s, p, o = triple
+        if p not in self.predicate_map.keys():
+            self.predicate_map[p] = {'forwards': DictDefault(set()),
+                                     'backwards': DictDefault(set())}
+        forwards = self.predicate_map[p]['forwards']
+        backwards = self.predicate_map[p]['backwards']
+
+        if isinstance(self.decode(s), URIRef):
+            if p == self._rdf_type:
+                if s not in forwards.keys():
+                    # replace default type by the first explicit one
+                    self._untype(s, self._rdfs_class)
+                self._type(s, o)
+            elif s not in self.object_type_map['object-to-type'].keys():
+                # untyped until proven otherwise
+                self._type(s, self._rdfs_class)
+
+        if s not in forwards.keys():
+            forwards[s] = {o}
+            self._subject_sets.pop(p, None)
+        else:
+            forwards[s].add(o)
+
+        if o not in backwards.keys():
+            backwards[o] = {s}
+        else:
+            backwards[o].add(s)
+        self._predicate_type_sets.pop(p, None)
+        self._adjacency.pop(p, None)
+
+        self._add_data_type(o)
+
+    def extend(self, triples):
+        """ Add an array of triples of IDs
+
+        Equivalent to adding each row with add_encoded, but the maps are
+        filled per subject and per object rather than per triple, which is
+        considerably faster for large arrays.
+        """
+        if len(triples) <= 0:
+            return
+
+        triples = np.asarray(triples)
+        triples = triples[np.lexsort((triples[:, 0], triples[:, 1]))]
+        for p, begin, end in _groups(triples[:, 1]):
+            p_triples = triples[begin:end]
+            if p not in self.predicate_map.keys():
+                self.predicate_map[p] = {'forwards': DictDefault(set()),
+                                         'backwards': DictDefault(set())}
+
+            _update(self.predicate_map[p]['forwards'],
+                    p_triples[:, 0],
+                    p_triples[:, 2])
+            self._subject_sets.pop(p, None)
+
+            p_triples = p_triples[np.argsort(p_triples[:, 2], kind='stable')]
+            _update(self.predicate_map[p]['backwards'],
+                    p_triples[:, 2],
+                    p_triples[:, 0])
+            self._predicate_type_sets.pop(p, None)
+            self._adjacency.pop(p, None)
+
+        # explicit types replace the default type, regardless of order
+        type_forwards = self.predicate_map[self._rdf_type]['forwards']\
+                if self._rdf_type in self.predicate_map.keys() else dict()
+        object_to_type = self.object_type_map['object-to-type']
+        for s in np.unique(triples[:, 0]).tolist():
+            if not isinstance(self.decode(s), URIRef):
+                continue
+
+            ctypes = type_forwards[s] if s in type_forwards.keys()\
+                    else {self._rdfs_class}
+            current = object_to_type[s] if s in object_to_type.keys()\
+                    else set()
+            for ctype in current - ctypes:
+                self._untype(s, ctype)
+            for ctype in ctypes - current:
+                self._type(s, ctype)
+
+        for o in np.unique(triples[:, 2]).tolist():
+            self._add_data_type(o)
+
+    def remove(self, triple):
+        """ Remove a triple of RDF terms """
+        triple = [self.lookup(term) for term in triple]
+        if None in triple:
+            # unknown term
+            return
+
+        self.remove_encoded(triple)
+
+    def remove_encoded(self, triple):
+        """ Remove a triple of IDs
+
+        All maps are updated in place. Whether an entity is still a subject,
+        or a literal still an object, requires a check of every predicate.
+        IDs remain assigned, such that the dictionary is never shrunk.
+        """
+        s, p, o = triple
+        if p not in self.predicate_map.keys() or\
+           o not in self.predicate_map[p]['forwards'][s]:
+            return
+
+        forwards = self.predicate_map[p]['forwards']
+        backwards = self.predicate_map[p]['backwards']
+
+        forwards[s].remove(o)
+        if len(forwards[s]) <= 0:
+            del forwards[s]
+            self._subject_sets.pop(p, None)
+
+        backwards[o].remove(s)
+        if len(backwards[o]) <= 0:
+            del backwards[o]
+        self._predicate_type_sets.pop(p, None)
+        self._adjacency.pop(p, None)
+
+        if len(forwards) <= 0:
+            del self.predicate_map[p]
+
+        object_to_type = self.object_type_map['object-to-type']
+        if isinstance(self.decode(s), URIRef):
+            if p == self._rdf_type:
+                self._untype(s, o)
+
+            if not any(s in maps['forwards'].keys() for maps in
+                       self.predicate_map.values()):
+                for ctype in list(object_to_type[s]):
+                    self._untype(s, ctype)
+                del object_to_type[s]
+            elif p == self._rdf_type and s not in forwards.keys():
+                # fall back to the default type
+                self._type(s, self._rdfs_class)
+
+        data_type_map = self.data_type_map
+        if o in data_type_map['object-to-type'].keys() and\
+           not any(o in maps['backwards'].keys() for maps in
+                   self.predicate_map.values()):
+            dtype = data_type_map['object-to-type'].pop(o)
+            data_type_map['type-to-object'][dtype].remove(o)
+            self._drop_literal_values(dtype)
+            if len(data_type_map['type-to-object'][dtype]) <= 0:
+                del data_type_map['type-to-object'][dtype]
+
+    def apply_delta(self, additions=(), removals=()):
+        """ Remove and then add triples of RDF terms
+
+        The cost depends on the size of the delta rather than on that of the
+        graph, which makes it much cheaper to keep a Cache up to date than
+        to rebuild it.
+        """
+        for triple in removals:
+            self.remove(triple)
+
+        for triple in additions:
+            self.add(triple)
+
+    def _add_data_type(self, o):
+        literal = self.decode(o)
+        if isinstance(literal, Literal) and\
+           o not in self.data_type_map['object-to-type'].keys():
+            dtype = literal.datatype
+            if dtype is None:
+                dtype = XSD.string if literal.language != None else XSD.anyType
+
+            if dtype not in self.data_type_map['type-to-object'].keys():
+                self.data_type_map['type-to-object'][dtype] = set()
+
+            self.data_type_map['type-to-object'][dtype].add(o)
+            self.data_type_map['object-to-type'][o] = dtype
+            self._drop_literal_values(dtype)
+
+    def _drop_literal_values(self, dtype):
+        if dtype not in self._literal_values.keys():
+            return
+
+        del self._literal_values[dtype]
+        for node in [node for node in self._literal_sets.keys()
+                     if node.type == dtype]:
+            del self._literal_sets[node]
+
+    def _type(self, e, ctype):
+        object_type_map = self.object_type_map
+        if ctype not in object_type_map['type-to-object'].keys():
+            object_type_map['type-to-object'][ctype] = set()
+        if e not in object_type_map['object-to-type'].keys():
+            object_type_map['object-to-type'][e] = set()
+
+        object_type_map['type-to-object'][ctype].add(e)
+        object_type_map['object-to-type'][e].add(ctype)
+        self._instance_sets.pop(ctype, None)
+        # e may be the object of any predicate
+        self._predicate_type_sets.clear()
+
+    def _untype(self, e, ctype):
+        object_type_map = self.object_type_map
+        if e not in object_type_map['type-to-object'][ctype]:
+            return
+
+        object_type_map['type-to-object'][ctype].remove(e)
+        object_type_map['object-to-type'][e].remove(ctype)
+        self._instance_sets.pop(ctype, None)
+        self._predicate_type_sets.clear()
+
+        if len(object_type_map['type-to-object'][ctype]) <= 0:
+            del object_type_map['type-to-object'][ctype]
+
+    def subject_set(self, p):
+        """ Return all subjects of a predicate as BitSet """
+        if p not in self._subject_sets.keys():
+            self._subject_sets[p] = BitSet(self.predicate_map[p]['forwards'].keys()
+                                           if p in self.predicate_map.keys()
+                                           else ())
+
+        return self._subject_sets[p]
+
+    def instance_set(self, t):
+        """ Return all instances of a type as BitSet """
+        if t not in self._instance_sets.keys():
+            self._instance_sets[t] = BitSet(self.object_type_map['type-to-object'][t]).intern()
+
+        return self._instance_sets[t]
+
+    def object_type_sets(self, p, t):
+        """ Return the subjects and objects of a predicate for which the
+        object is an instance of type t, as two BitSets
+        """
+        return self._index_predicate_types(p)['object-type'].get(t, _NO_SETS)
+
+    def data_type_sets(self, p, t):
+        """ Return the subjects and objects of a predicate for which the
+        object is a literal of data type t, as two BitSets
+        """
+        return self._index_predicate_types(p)['data-type'].get(t, _NO_SETS)
+
+    def _index_predicate_types(self, p):
+        # index all types of the objects of a predicate at once
+        if p in self._predicate_type_sets.keys():
+            return self._predicate_type_sets[p]
+
+        object_types = dict()
+        data_types = dict()
+        backwards = self.predicate_map[p]['backwards']\
+                if p in self.predicate_map.keys() else dict()
+        object_to_type = self.object_type_map['object-to-type']
+        object_to_dtype = self.data_type_map['object-to-type']
+        for o in backwards.keys():
+            dtype = object_to_dtype.get(o)
+            if dtype is not None:
+                data_types.setdefault(dtype, list()).append(o)
+                continue
+
+            for ctype in object_to_type.get(o, ()):
+                object_types.setdefault(ctype, list()).append(o)
+
+        index = dict()
+        for key, types in [('object-type', object_types),
+                           ('data-type', data_types)]:
+            index[key] = {t: (BitSet(chain.from_iterable(backwards[o]
+                                                         for o in objects)),
+                              BitSet(objects))
+                          for t, objects in types.items()}
+
+        self._predicate_type_sets[p] = index
+
+        return index
+
+    def adjacency(self, p):
+        """ Return the forward and backward maps of a predicate as CSR
+
+        Each map is a tuple (keys, offsets, values) of arrays, with keys
+        sorted and the values of keys[i] at values[offsets[i]:offsets[i+1]].
+        """
+        if p not in self._adjacency.keys():
+            maps = self.predicate_map[p] if p in self.predicate_map.keys()\
+                    else {'forwards': dict(), 'backwards': dict()}
+            self._adjacency[p] = {direction: _csr(maps[direction]) for
+                                  direction in ('forwards', 'backwards')}
+
+        return self._adjacency[p]
+
+    def literal_values(self, dtype):
+        """ Return the IDs of all literals of a data type, sorted, and their
+        values as cast by cast_xsd, as two arrays
+        """
+        if dtype not in self._literal_values.keys():
+            ids = np.array(sorted(self.data_type_map['type-to-object'][dtype]),
+                           dtype=np.int64)
+            values = cast_xsd_array([self.decode(o) for o in ids.tolist()],
+                                    dtype)
+
+            self._literal_values[dtype] = (ids, values)
+
+        return self._literal_values[dtype]
+
+    def literal_set(self, node):
+        """ Return all literals that satisfy a multimodal node as BitSet """
+        if node not in self._literal_sets.keys():
+            ids, values = self.literal_values(node.type)
+            self._literal_sets[node] = BitSet(ids[node.mask(values)])
+
+        return self._literal_sets[node]
+
+    def triples(self, pattern=(None, None, None)):
+        """ Yield all triples that match a pattern, similar to an rdflib
+        Graph. Both pattern and triples consist of RDF terms.
+        """
+        s, p, o = [None if term is None else self.lookup(term)
+                   for term in pattern]
+        for term, key in zip(pattern, (s, p, o)):
+            if term is not None and key is None:
+                # unknown term
+                return
+
+        predicates = self.predicate_map.keys() if p is None else\
+                     [p] if p in self.predicate_map.keys() else []
+        for predicate in predicates:
+            forwards = self.predicate_map[predicate]['forwards']
+            if s is not None:
+                subjects = [s] if s in forwards.keys() else []
+            elif o is not None:
+                subjects = self.predicate_map[predicate]['backwards'][o]
+            else:
+                subjects = forwards.keys()
+
+            for subject in subjects:
+                for resource in forwards[subject]:
+                    if o is not None and resource != o:
+                        continue
+
+                    yield (self.decode(subject),
+                           self.decode(predicate),
+                           self.decode(resource))
+
+    def bind(self, prefix, namespace):
+        """ Bind a prefix to a namespace """
+        self._namespaces[prefix] = namespace
+
+    def namespaces(self):
+        """ Yield all (prefix, namespace) bindings """
+        for prefix, namespace in self._namespaces.items():
+            yield (prefix, namespace)
+
+    def encode(self, term):
+        """ Return the ID of a term, assigning one if it has none yet """
+        if self.dictionary is None:
+            return term
+
+        return self.dictionary.encode(term)
+
+    def lookup(self, term):
+        """ Return the ID of a term, or None if it has none """
+        if self.dictionary is None:
+            return term
+
+        return self.dictionary.lookup(term)
+
+    def decode(self, term):
+        """ Return the RDF term of an ID; other values are returned as is """
+        if self.dictionary is None or type(term) is not int:
+            return term
+
+        return self.dictionary.decode(term)
+
+
+_NO_SETS = (BitSet(), BitSet())
+
+def _groups(keys):
+    # yield (key, begin, end) for each run of equal keys in a sorted array
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+    begins = [0] + bounds.tolist()
+    ends = bounds.tolist() + [len(keys)]
+    for key, begin, end in zip(keys[begins].tolist(), begins, ends):
+        yield (key, begin, end)
+
+def _csr(index):
+    # compressed sparse rows of a map from IDs to sets of IDs
+    keys = np.array(sorted(index.keys()), dtype=np.int64)
+    lengths = np.fromiter((len(index[key]) for key in keys.tolist()),
+                          dtype=np.int64, count=len(keys))
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.fromiter(chain.from_iterable(index[key] for key in
+                                             keys.tolist()),
+                         dtype=np.int64, count=int(offsets[-1]))
+
+    return (keys, offsets, values)
+
+def _update(index, keys, values):
+    # add values to the sets of their keys; keys must be sorted
+    values = values.tolist()
+    for key, begin, end in _groups(keys):
+        members = index.get(key)  # bypasses the default
+        if members is None:
+            index[key] = set(values[begin:end])
+        else:
+            members.update(values[begin:end])
+
+
+class CacheStore(Store):
+    """ Cache Store class
+
+    Write-only rdflib store that passes all triples on to a Cache instead
+    of storing them, allowing a Cache to be filled straight from any of
+    rdflib's parsers. Only namespace bindings are kept.
+    """
+    cache = None
+    _namespaces = None
+
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self._namespaces = dict()
+
+    def add(self, triple, context, quoted=False):
+        self.cache.add(triple)
+
+    def bind(self, prefix, namespace, override=True):
+        if not override and prefix in self._namespaces.keys():
+            return
+
+        self._namespaces[prefix] = namespace
+
+    def namespace(self, prefix):
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace):
+        for prefix, bound_namespace in self._namespaces.items():
+            if bound_namespace == namespace:
+                return prefix
+
+        return None
+
+    def namespaces(self):
+        for prefix, namespace in self._namespaces.items():
+            yield (prefix, namespace)
+
+
+class TermDictionary():
+    """ Term Dictionary class
+
+    Bidirectional mapping between RDF terms and dense integer IDs, with IDs
+    being assigned in order of appearance.
+    """
+    _ids = None
+    _terms = None
+
+    def __init__(self):
+        self._ids = dict()
+        self._terms = list()
+
+    def encode(self, term):
+        i = self._ids.get(term)
+        if i is None:
+            i = len(self._terms)
+            self._ids[term] = i
+            self._terms.append(term)
+
+        return i
+
+    def lookup(self, term):
+        return self._ids.get(term)
+
+    def decode(self, i):
+        return self._terms[i]
+
+    def __contains__(self, term):
+        return term in self._ids.keys()
+
+    def __iter__(self):
+        # in order of ID
+        return iter(self._terms)
 
-    def __init__(self, g):
-        # TODO: compute these more efficient and with less repeation
-        self.object_type_map = generate_object_type_map(g)
-        self.data_type_map = generate_data_type_map(g)
-        self.predicate_map = generate_predicate_map(g)
+    def __len__(self):
+        return len(self._terms)
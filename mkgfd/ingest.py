@@ -0,0 +1,152 @@
+#! /usr/bin/env python
+
+from array import array
+import os
+from uuid import uuid4
+
+import numpy as np
+from rdflib import Graph
+from pathos.pools import ProcessPool
+
+from mkgfd.cache import Cache, CacheStore, TermDictionary
+from mkgfd.ntriples import (guess_format, open_compressed, read_delta,
+                            read_ntriples, split_ntriples, NTRIPLES_FORMATS)
+from mkgfd.snapshot import fingerprints, load_snapshot, save_snapshot
+
+
+def load_cache(paths, snapshot_dir=None, nproc=1, deltas=()):
+    """ Create a Cache from one or more serialized graphs
+
+    N-Triples and N-Quads are streamed straight into the Cache; other formats
+    are passed on to rdflib's parsers. Input may be gzip or bzip2 compressed.
+    With more than one process, files and chunks of large uncompressed
+    N-Triples or N-Quads files are parsed in parallel. Deltas are applied
+    afterwards, in order.
+
+    If a snapshot directory is given, the Cache is reloaded from a snapshot
+    of the same input files if one exists, and stored as such otherwise.
+    Snapshots with only the first deltas applied are reused as well, and
+    updated with the remaining ones.
+    """
+    snapshots = list()
+    if snapshot_dir is not None:
+        snapshots = [os.path.join(snapshot_dir, key) for key in
+                     fingerprints(paths, deltas)]
+
+    cache = None
+    num_applied = 0
+    for i in reversed(range(len(snapshots))):
+        if os.path.isdir(snapshots[i]):
+            cache = load_snapshot(snapshots[i])
+            num_applied = i
+
+            break
+
+    if cache is None:
+        if nproc > 1:
+            cache = load_cache_mp(paths, nproc)
+        else:
+            cache = Cache()
+            for gf in paths:
+                fmt = guess_format(gf)
+                if fmt in NTRIPLES_FORMATS:
+                    for triple in read_ntriples(gf):
+                        cache.add(triple)
+
+                    continue
+
+                with open_compressed(gf, 'rb') as f:
+                    cache.parse(f, format=fmt)
+
+        if len(snapshots) > 0:
+            save_snapshot(cache, snapshots[0])
+
+    if num_applied < len(deltas):
+        for delta in deltas[num_applied:]:
+            additions, removals = read_delta(delta)
+            cache.apply_delta(additions, removals)
+
+        if len(snapshots) > 0:
+            save_snapshot(cache, snapshots[-1])
+
+    return cache
+
+def load_cache_mp(paths, nproc):
+    """ Create a Cache by parsing files and chunks thereof in parallel
+
+    Each task yields a shard with its own dictionary. Shards are merged in
+    input order, which assigns the same IDs as a sequential load would.
+    """
+    tasks = list()
+    for gf in paths:
+        fmt = guess_format(gf)
+        if fmt not in NTRIPLES_FORMATS:
+            tasks.append((gf, fmt, 0, None, None))
+            continue
+
+        # chunks of the same file share their blank nodes
+        bnode_prefix = uuid4().hex[:8]
+        for start, end in split_ntriples(gf, nproc):
+            tasks.append((gf, fmt, start, end, bnode_prefix))
+
+    cache = Cache()
+    # a pool of our own, rather than the one pathos keeps for reuse by any
+    # pool of as many processes, which is closed once we are done
+    pool = ProcessPool(nproc, id=uuid4().hex)
+    try:
+        for terms, triples, namespaces in pool.imap(load_shard_mp, tasks):
+            # map shard IDs onto global IDs
+            remap = np.fromiter((cache.encode(term) for term in terms),
+                                dtype=np.int64,
+                                count=len(terms))
+            cache.extend(remap[triples])
+
+            for prefix, namespace in namespaces:
+                cache.bind(prefix, namespace)
+    finally:
+        pool.clear()
+
+    return cache
+
+def load_shard_mp(inputs):
+    gf, fmt, start, end, bnode_prefix = inputs
+
+    shard = Shard()
+    namespaces = list()
+    if fmt in NTRIPLES_FORMATS:
+        for triple in read_ntriples(gf, start, end, bnode_prefix):
+            shard.add(triple)
+    else:
+        g = Graph(store=CacheStore(shard))
+        with open_compressed(gf, 'rb') as f:
+            g.parse(f, format=fmt)
+
+        namespaces = list(g.namespaces())
+
+    return (list(shard.dictionary), shard.triples(), namespaces)
+
+
+class Shard():
+    """ Shard class
+
+    Partial result of loading a graph: triples as rows of IDs that are local
+    to the shard, together with the dictionary these IDs refer to. Unlike a
+    Cache, no maps are built.
+    """
+    dictionary = None
+    _ids = None
+
+    def __init__(self):
+        self.dictionary = TermDictionary()
+        self._ids = array('q')
+
+    def add(self, triple):
+        """ Add a triple of RDF terms """
+        s, p, o = triple
+        self._ids.extend((self.dictionary.encode(s),
+                          self.dictionary.encode(p),
+                          self.dictionary.encode(o)))
+
+    def triples(self):
+        """ Return all triples as an array of IDs """
+        return np.frombuffer(self._ids, dtype=np.int64).reshape((-1, 3))
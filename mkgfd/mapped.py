@@ -0,0 +1,388 @@
+#! /usr/bin/env python
+
+from collections.abc import Mapping
+from hashlib import blake2b
+import os
+
+import numpy as np
+from rdflib.namespace import RDF, RDFS
+from rdflib.term import BNode, Literal, URIRef
+
+from mkgfd.cache import Cache, _csr
+
+
+_URIREF = 0
+_BNODE = 1
+_LITERAL = 2
+
+def save_mapped(cache, path):
+    """ Write an encoded Cache as flat arrays to a directory, for use by
+    MappedCache
+
+    All maps are stored as compressed sparse rows (CSR): the forward and
+    backward maps of all predicates, the instances of each type and the
+    types of each instance, and the literals of each data type. The
+    dictionary is stored as a single UTF-8 blob of lexical forms with offsets
+    in bytes, such that single terms can be decoded, and with a sorted array
+    of digests to look terms up.
+    """
+    if cache.dictionary is None:
+        raise ValueError("Only encoded caches can be mapped")
+
+    os.makedirs(path, exist_ok=True)
+    def save(name, array):
+        np.save(os.path.join(path, name + ".npy"), array)
+
+    # dictionary
+    num_terms = len(cache.dictionary)
+    kinds = np.empty(num_terms, dtype=np.uint8)
+    offsets = np.empty(num_terms + 1, dtype=np.int64)
+    term_annotations = np.full(num_terms, -1, dtype=np.int32)
+    digests = np.empty(num_terms, dtype=np.uint64)
+    annotations = dict()  # datatype or language tag -> index
+
+    lexicals = list()
+    offset = 0
+    for i, term in enumerate(cache.dictionary):
+        kind, lexical, annotation = _record(term)
+        lexical = lexical.encode('utf-8', 'surrogatepass')
+        lexicals.append(lexical)
+
+        offsets[i] = offset
+        offset += len(lexical)
+
+        kinds[i] = kind
+        if annotation is not None:
+            term_annotations[i] = annotations.setdefault(annotation,
+                                                         len(annotations))
+        digests[i] = _digest(kind, lexical, annotation)
+    offsets[-1] = offset
+
+    save("kinds", kinds)
+    save("offsets", offsets)
+    save("lexicals", np.frombuffer(b"".join(lexicals), dtype=np.uint8))
+    save("term_annotations", term_annotations)
+    save("annotations", np.array(list(annotations.keys()), dtype=str))
+    del lexicals
+
+    order = np.argsort(digests, kind='stable')
+    save("digests", digests[order])
+    save("order", order.astype(np.int64))
+
+    # predicates, each with a range of keys in the CSR of both directions
+    predicates = sorted(cache.predicate_map.keys())
+    save("predicates", np.array(predicates, dtype=np.int64))
+    for direction in ('forwards', 'backwards'):
+        _save_csr(save, direction, [cache.predicate_map[p][direction]
+                                    for p in predicates])
+
+    # types
+    for name, index in [("instances", cache.object_type_map['type-to-object']),
+                        ("types", cache.object_type_map['object-to-type'])]:
+        _save_csr(save, name, [index])
+
+    # data types, kept as is
+    dtypes = sorted(cache.data_type_map['type-to-object'].keys())
+    save("dtypes", np.array([str(dtype) for dtype in dtypes], dtype=str))
+    _save_csr(save, "literals", [{i: cache.data_type_map['type-to-object'][dtype]
+                                  for i, dtype in enumerate(dtypes)}])
+
+    save("namespaces", np.array([[prefix, str(namespace)] for prefix, namespace
+                                 in cache.namespaces()],
+                                dtype=str).reshape((-1, 2)))
+
+def _save_csr(save, name, indices):
+    # concatenate the CSR of several maps, with pointers into the keys
+    pointers = np.zeros(len(indices) + 1, dtype=np.int64)
+    keys, offsets, values = list(), [np.zeros(1, dtype=np.int64)], list()
+    num_values = 0
+    for i, index in enumerate(indices):
+        index_keys, index_offsets, index_values = _csr(index)
+        pointers[i+1] = pointers[i] + len(index_keys)
+
+        keys.append(index_keys)
+        offsets.append(index_offsets[1:] + num_values)
+        values.append(index_values)
+        num_values += len(index_values)
+
+    save(name + "_pointers", pointers)
+    save(name + "_keys", np.concatenate(keys) if len(keys) > 0
+                         else np.empty(0, dtype=np.int64))
+    save(name + "_offsets", np.concatenate(offsets))
+    save(name + "_values", np.concatenate(values) if len(values) > 0
+                           else np.empty(0, dtype=np.int64))
+
+def _record(term):
+    # kind, lexical form, and annotation of a term
+    if isinstance(term, Literal):
+        annotation = None
+        if term.datatype is not None:
+            annotation = "^^" + str(term.datatype)
+        elif term.language is not None:
+            annotation = "@" + term.language
+
+        return (_LITERAL, str(term), annotation)
+    if isinstance(term, BNode):
+        return (_BNODE, str(term), None)
+
+    return (_URIREF, str(term), None)
+
+def _digest(kind, lexical, annotation):
+    h = blake2b(digest_size=8)
+    h.update(b"%d\0" % kind)
+    if annotation is not None:
+        h.update(annotation.encode('utf-8', 'surrogatepass'))
+    h.update(b"\0")
+    h.update(lexical)
+
+    return int.from_bytes(h.digest(), 'little')
+
+
+class MappedCache(Cache):
+    """ Mapped Cache class
+
+    Read-only Cache on the arrays written by save_mapped, which are memory
+    mapped rather than loaded. All processes which map the same directory
+    share a single copy of the index, as their pages are never written to;
+    if the directory is in shared memory, such as /dev/shm, the index is not
+    even read from disk.
+
+    The maps behave as those of a Cache, but are views on the arrays: IDs are
+    yielded as lists rather than as sets, and unknown keys yield an empty
+    list. The sets derived from the maps, such as the instances of a type as
+    BitSet, are still computed on request and kept per process.
+    """
+    path = None
+
+    def __init__(self, path):
+        self.path = path
+        self._subject_sets = dict()
+        self._instance_sets = dict()
+        self._predicate_type_sets = dict()
+        self._literal_values = dict()
+        self._literal_sets = dict()
+        self._adjacency = dict()
+
+        def load(name, mmap_mode='r'):
+            return np.load(os.path.join(path, name + ".npy"),
+                           mmap_mode=mmap_mode)
+
+        self.dictionary = MappedTermDictionary(load("kinds"),
+                                               load("offsets"),
+                                               load("lexicals"),
+                                               load("term_annotations"),
+                                               load("annotations",
+                                                    mmap_mode=None).tolist(),
+                                               load("digests"),
+                                               load("order"))
+        self._rdf_type = self.lookup(RDF.type)
+        self._rdfs_class = self.lookup(RDFS.Class)
+
+        csr = {name: [load(name + suffix) for suffix in
+                      ("_pointers", "_keys", "_offsets", "_values")]
+               for name in ("forwards", "backwards", "instances", "types",
+                            "literals")}
+
+        self.predicate_map = dict()
+        for i, p in enumerate(load("predicates").tolist()):
+            self.predicate_map[p] = {direction: _CSRMap(*_csr_of(csr[direction], i))
+                                     for direction in ('forwards', 'backwards')}
+
+        self.object_type_map = {'type-to-object': _CSRMap(*_csr_of(csr["instances"], 0)),
+                                'object-to-type': _CSRMap(*_csr_of(csr["types"], 0))}
+
+        dtypes = [URIRef(dtype) for dtype in load("dtypes", mmap_mode=None).tolist()]
+        keys, offsets, values = _csr_of(csr["literals"], 0)
+        literal_types = np.repeat(keys, np.diff(offsets))
+        order = np.argsort(values[offsets[0]:offsets[-1]], kind='stable')
+        self.data_type_map = {'type-to-object': {dtypes[i]: values[offsets[j]:offsets[j+1]]
+                                                 for j, i in enumerate(keys.tolist())},
+                              'object-to-type': _TableMap(values[offsets[0]:offsets[-1]][order],
+                                                          literal_types[order],
+                                                          dtypes)}
+
+        self._namespaces = {prefix: URIRef(namespace) for prefix, namespace in
+                            load("namespaces", mmap_mode=None).tolist()}
+
+    def add_encoded(self, triple):
+        raise TypeError("MappedCache is read-only")
+
+    def extend(self, triples):
+        raise TypeError("MappedCache is read-only")
+
+    def remove_encoded(self, triple):
+        raise TypeError("MappedCache is read-only")
+
+    def adjacency(self, p):
+        """ Return the forward and backward maps of a predicate as CSR, as
+        views on the mapped arrays
+        """
+        if p not in self.predicate_map.keys():
+            return super().adjacency(p)
+
+        return {direction: self.predicate_map[p][direction].csr()
+                for direction in ('forwards', 'backwards')}
+
+    def __reduce__(self):
+        return (MappedCache, (self.path,))
+
+def _csr_of(csr, i):
+    # keys, offsets, and values of the i-th map; offsets index all values
+    pointers, keys, offsets, values = csr
+
+    return (keys[pointers[i]:pointers[i+1]],
+            offsets[pointers[i]:pointers[i+1]+1],
+            values)
+
+
+class _CSRMap(Mapping):
+    """ Read-only map from IDs onto lists of IDs, as view on CSR arrays """
+
+    def __init__(self, keys, offsets, values):
+        self._keys = keys
+        self._offsets = offsets
+        self._values = values
+
+    def _position(self, key):
+        if not isinstance(key, (int, np.integer)):
+            return -1
+
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+
+        return -1
+
+    def __getitem__(self, key):
+        # as DictDefault(set())
+        i = self._position(key)
+        if i < 0:
+            return []
+
+        return self._values[self._offsets[i]:self._offsets[i+1]].tolist()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __contains__(self, key):
+        return self._position(key) >= 0
+
+    def __iter__(self):
+        return iter(self._keys.tolist())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def csr(self):
+        """ Return the map as (keys, offsets, values) """
+        return (self._keys, self._offsets, self._values)
+
+
+class _TableMap(Mapping):
+    """ Read-only map from IDs onto entries of a table """
+
+    def __init__(self, keys, entries, table):
+        self._keys = keys
+        self._entries = entries
+        self._table = table
+
+    def _position(self, key):
+        if not isinstance(key, (int, np.integer)):
+            return -1
+
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+
+        return -1
+
+    def __getitem__(self, key):
+        # as DictDefault(None)
+        i = self._position(key)
+        if i < 0:
+            return None
+
+        return self._table[self._entries[i]]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __contains__(self, key):
+        return self._position(key) >= 0
+
+    def __iter__(self):
+        return iter(self._keys.tolist())
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class MappedTermDictionary():
+    """ Mapped Term Dictionary class
+
+    Read-only mapping between RDF terms and IDs, as views on the arrays
+    written by save_mapped. Terms are decoded when requested, and looked up
+    by digest.
+    """
+
+    def __init__(self, kinds, offsets, lexicals, term_annotations,
+                 annotations, digests, order):
+        self._kinds = kinds
+        self._offsets = offsets
+        self._lexicals = lexicals
+        self._term_annotations = term_annotations
+        self._digests = digests
+        self._order = order
+
+        self._annotations = list()
+        for annotation in annotations:
+            if annotation.startswith("^^"):
+                self._annotations.append((URIRef(annotation[2:]), None))
+            else:
+                self._annotations.append((None, annotation[1:]))
+
+    def encode(self, term):
+        i = self.lookup(term)
+        if i is None:
+            raise TypeError("MappedTermDictionary is read-only")
+
+        return i
+
+    def lookup(self, term):
+        kind, lexical, annotation = _record(term)
+        digest = _digest(kind, lexical.encode('utf-8', 'surrogatepass'),
+                         annotation)
+
+        begin = int(np.searchsorted(self._digests, digest, side='left'))
+        end = int(np.searchsorted(self._digests, digest, side='right'))
+        for i in self._order[begin:end].tolist():
+            if self.decode(i) == term:
+                return i
+
+        return None
+
+    def decode(self, i):
+        lexical = self._lexicals[self._offsets[i]:self._offsets[i+1]]\
+                .tobytes().decode('utf-8', 'surrogatepass')
+
+        kind = self._kinds[i]
+        if kind == _LITERAL:
+            annotation = self._term_annotations[i]
+            datatype, language = self._annotations[annotation]\
+                    if annotation >= 0 else (None, None)
+
+            return Literal(lexical, lang=language, datatype=datatype)
+        if kind == _BNODE:
+            return BNode(lexical)
+
+        return URIRef(lexical)
+
+    def __contains__(self, term):
+        return self.lookup(term) is not None
+
+    def __iter__(self):
+        # in order of ID
+        return (self.decode(i) for i in range(len(self)))
+
+    def __len__(self):
+        return len(self._kinds)
@@ -1,174 +1,610 @@
 #! /usr/bin/env python
 
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+
+from mkgfd.bitset import BitSet
 from mkgfd.structures import IdentityAssertion, DataTypeVariable, MultiModalNode, ObjectTypeVariable, TypeVariable
-from mkgfd.utils import cast_xsd
 
 
-def confidence_of(predicate_map,
-               object_type_map,
-               data_type_map,
-               assertion,
-               assertion_domain):
+def confidence_of(cache,
+                  assertion,
+                  assertion_domain):
     """ Calculate confidence for a Clause head
 
-    Assumes that domain satisfies the Clause body that belongs to this head
+    Assumes that domain satisfies the Clause body that belongs to this head.
+    Domains are BitSets.
     """
-    confidence = 0
-    assertion_domain_updated = set()
+    predicate_map = cache.predicate_map
+
     if not isinstance(assertion.rhs, TypeVariable):
-        # either an entity or literal
-        for entity in assertion_domain:
-            if assertion.rhs in predicate_map[assertion.predicate]['forwards'][entity]:
-                # P(e, u) holds
-                assertion_domain_updated.add(entity)
-                confidence += 1
-    elif isinstance(assertion.rhs, ObjectTypeVariable):
-        for entity in assertion_domain:
-            satisfied = False
-            for resource in predicate_map[assertion.predicate]['forwards'][entity]:
-                for ctype in object_type_map['object-to-type'][resource]:
-                    if ctype == assertion.rhs.type:
-                        # P(e, ?) with object type(?, t) holds
-                        assertion_domain_updated.add(entity)
-                        confidence += 1
-                        satisfied = True
-                        break
-
-                if satisfied:
-                    break
+        # either an entity or literal; P(e, u) holds
+        assertion_domain_updated = assertion_domain &\
+                BitSet(predicate_map[assertion.predicate]['backwards'][assertion.rhs])
+
+        return (len(assertion_domain_updated), assertion_domain_updated)
+
+    if isinstance(assertion.rhs, ObjectTypeVariable):
+        # P(e, ?) with object type(?, t) holds
+        subjects, _ = cache.object_type_sets(assertion.predicate,
+                                             assertion.rhs.type)
+        assertion_domain_updated = assertion_domain & subjects
     elif isinstance(assertion.rhs, DataTypeVariable):
-        for entity in assertion_domain:
-            for resource in predicate_map[assertion.predicate]['forwards'][entity]:
-                if data_type_map['object-to-type'][resource] == assertion.rhs.type:
-                    # P(e, ?) with data type(?, t) holds
-                    assertion_domain_updated.add(entity)
-                    confidence += 1
-                    break
+        # P(e, ?) with data type(?, t) holds
+        subjects, _ = cache.data_type_sets(assertion.predicate,
+                                           assertion.rhs.type)
+        assertion_domain_updated = assertion_domain & subjects
     elif isinstance(assertion.rhs, MultiModalNode):
-        for entity in assertion_domain:
-            for resource in predicate_map[assertion.predicate]['forwards'][entity]:
-                if data_type_map['object-to-type'][resource] == assertion.rhs.type\
-                   and cast_xsd(resource, assertion.rhs.type) in assertion.rhs:
-                    # P(e, u) with u satisfied by multimodal pattern
-                    assertion_domain_updated.add(entity)
-                    confidence +=1
-                    break
-
-    return (confidence, assertion_domain_updated)
-
-def support_of(predicate_map,
-            object_type_map,
-            data_type_map,
-            graph_pattern,
-            assertion,
-            assertion_domain,
-            min_support):
+        # P(e, u) with u satisfied by multimodal pattern
+        _, resources = cache.data_type_sets(assertion.predicate,
+                                            assertion.rhs.type)
+        backwards = predicate_map[assertion.predicate]['backwards']
+        assertion_domain_updated = assertion_domain &\
+                BitSet(chain.from_iterable(backwards[resource] for resource in
+                                           resources & cache.literal_set(assertion.rhs)))
+    else:
+        assertion_domain_updated = BitSet()
+
+    return (len(assertion_domain_updated), assertion_domain_updated)
+
+def support_of(cache,
+               graph_pattern,
+               assertion,
+               assertion_domain,
+               min_support,
+               memo=None):
     """ Calculate Minimal Image-Based Support for a Clause body
 
     Returns -1 if support < min_support
 
     Optimized to minimalize the work done by continuously reducing the search
-    space and by early stopping when possible
+    space and by early stopping when possible. Domains are BitSets. If a
+    SupportMemo is given, the results of all sub-patterns are looked up in,
+    and added to, this memo.
     """
+    return _memoized(_support_of, cache, graph_pattern, assertion,
+                     assertion_domain, min_support, memo)
+
+def _support_of(cache, graph_pattern, assertion, assertion_domain,
+                min_support, memo):
+    predicate_map = cache.predicate_map
 
     assertion_key = hash(assertion)
     # no need to continue if we are a leaf (optimization)
     if len(graph_pattern.connections[assertion_key]) <= 0:
         if isinstance(assertion, IdentityAssertion):
-            return (len(assertion_domain), {e for e in assertion_domain})
-
-        support = 0
-        assertion_domain_updated = set()
-        if not isinstance(assertion.rhs, TypeVariable):
-            # either an entity or literal
-            for entity in assertion_domain:
-                if assertion.rhs in predicate_map[assertion.predicate]['forwards'][entity]:
-                    # P(e, u) holds
-                    assertion_domain_updated.add(entity)
-                    support += 1
-        elif isinstance(assertion.rhs, ObjectTypeVariable):
-            for entity in assertion_domain:
-                satisfied = False
-                for resource in predicate_map[assertion.predicate]['forwards'][entity]:
-                    for ctype in object_type_map['object-to-type'][resource]:
-                        if ctype == assertion.rhs.type:
-                            # P(e, ?) with object type(?, t) holds
-                            assertion_domain_updated.add(entity)
-                            support += 1
-                            satisfied = True
-                            break
-
-                if satisfied:
-                    break
-        elif isinstance(assertion.rhs, DataTypeVariable):
-            for entity in assertion_domain:
-                for resource in predicate_map[assertion.predicate]['forwards'][entity]:
-                    if data_type_map['object-to-type'][resource] == assertion.rhs.type:
-                        # P(e, ?) with data type(?, t) holds
-                        assertion_domain_updated.add(entity)
-                        support += 1
-                        break
-        elif isinstance(assertion.rhs, MultiModalNode):
-            for entity in assertion_domain:
-                for resource in predicate_map[assertion.predicate]['forwards'][entity]:
-                    if data_type_map['object-to-type'][resource] == assertion.rhs.type\
-                       and cast_xsd(resource, assertion.rhs.type) in assertion.rhs:
-                        # P(e, u) with u satisfied by multimodal pattern
-                        assertion_domain_updated.add(entity)
-                        support +=1
-                        break
-
-        return (support, assertion_domain_updated)
+            return (len(assertion_domain), assertion_domain)
+
+        # same as the head's confidence
+        return confidence_of(cache, assertion, assertion_domain)
 
     # retrieve range based on assertion's domain
     if isinstance(assertion, IdentityAssertion):
-        assertion_range = {e for e in assertion_domain}
+        assertion_range = assertion_domain
     else:  # type is Assertion with ObjectTypeVariable as rhs
-        assertion_range = set()
-        for entity in assertion_domain:
-            for resource in predicate_map[assertion.predicate]['forwards'][entity]:
-                for ctype in object_type_map['object-to-type'][resource]:
-                    if ctype == assertion.rhs.type:
-                        # Note: type check requires '==' as ID changes in MP mode
-                        assertion_range.add(resource)
-                        break
+        subjects, resources = cache.object_type_sets(assertion.predicate,
+                                                     assertion.rhs.type)
+        forwards = predicate_map[assertion.predicate]['forwards']
+        assertion_range = resources &\
+                BitSet(chain.from_iterable(forwards[entity] for entity in
+                                           assertion_domain & subjects))
 
     # update range by intersections with domains of connected assertions (optimization)
     # eg, if p(e, v) and q(.,.), check if e in domain of q
     for connection in graph_pattern.connections[assertion_key]:
-        assertion_range &= frozenset(predicate_map[connection.predicate]['forwards'].keys())
+        assertion_range &= cache.subject_set(connection.predicate)
 
         if len(assertion_range) < min_support:
-            return (-1, set())
+            return (-1, BitSet())
 
     # update range based on connected assertions' returned updated domains
     # search space is reduced after each returned update
-    connection_domain = assertion_range  # only for readability
     for connection in graph_pattern.connections[assertion_key]:
-        support, range_update = support_of(predicate_map,
-                                        object_type_map,
-                                        data_type_map,
-                                        graph_pattern,
-                                        connection,
-                                        connection_domain,
-                                        min_support)
+        support, range_update = support_of(cache,
+                                           graph_pattern,
+                                           connection,
+                                           assertion_range,
+                                           min_support,
+                                           memo)
         if support < min_support:
-            return (-1, set())
+            return (-1, BitSet())
 
         assertion_range &= range_update
 
         if len(assertion_range) < min_support:
-            return (-1, set())
+            return (-1, BitSet())
 
     # update domain based on updated range
     if isinstance(assertion, IdentityAssertion):
         return (len(assertion_range), assertion_range)
 
-    assertion_domain_updated = set()
-    for resource in assertion_range:
-        domain_update = predicate_map[assertion.predicate]['backwards'][resource]
-        assertion_domain_updated |= domain_update
+    backwards = predicate_map[assertion.predicate]['backwards']
+    assertion_domain_updated = BitSet(chain.from_iterable(backwards[resource]
+                                                          for resource in assertion_range))
 
     support = len(assertion_domain_updated)
 
     return (support, assertion_domain_updated)
+
+def confidence_of_vectorized(cache,
+                             assertion,
+                             assertion_domain):
+    """ Calculate confidence for a Clause head, as confidence_of
+
+    Evaluated on sorted arrays of IDs and the CSR maps of the Cache rather
+    than per entity. Domains are BitSets.
+    """
+    assertion_domain_updated = _satisfy_head(cache, assertion,
+                                             _ids(assertion_domain))
+
+    return (len(assertion_domain_updated), BitSet(assertion_domain_updated))
+
+def support_of_vectorized(cache,
+                          graph_pattern,
+                          assertion,
+                          assertion_domain,
+                          min_support,
+                          memo=None):
+    """ Calculate Minimal Image-Based Support for a Clause body, as
+    support_of
+
+    Evaluated on sorted arrays of IDs and the CSR maps of the Cache rather
+    than per entity. Domains are BitSets.
+    """
+    support, assertion_domain_updated = _memoized(_support_of_array,
+                                                  cache,
+                                                  graph_pattern,
+                                                  assertion,
+                                                  _ids(assertion_domain),
+                                                  min_support,
+                                                  memo)
+
+    return (support, BitSet(assertion_domain_updated))
+
+def _support_of_array(cache, graph_pattern, assertion, assertion_domain,
+                      min_support, memo):
+    assertion_key = hash(assertion)
+    # no need to continue if we are a leaf (optimization)
+    if len(graph_pattern.connections[assertion_key]) <= 0:
+        if isinstance(assertion, IdentityAssertion):
+            return (len(assertion_domain), assertion_domain)
+
+        assertion_domain_updated = _satisfy_head(cache, assertion,
+                                                 assertion_domain)
+
+        return (len(assertion_domain_updated), assertion_domain_updated)
+
+    # retrieve range based on assertion's domain
+    if isinstance(assertion, IdentityAssertion):
+        assertion_range = assertion_domain
+    else:  # type is Assertion with ObjectTypeVariable as rhs
+        subjects, resources = cache.object_type_sets(assertion.predicate,
+                                                     assertion.rhs.type)
+        forwards = cache.adjacency(assertion.predicate)['forwards']
+        assertion_range = _intersect(_ids(resources),
+                                     _gather(forwards,
+                                             _intersect(assertion_domain,
+                                                        _ids(subjects))))
+
+    # update range by intersections with domains of connected assertions (optimization)
+    for connection in graph_pattern.connections[assertion_key]:
+        subjects = cache.adjacency(connection.predicate)['forwards'][0]
+        assertion_range = _intersect(assertion_range, subjects)
+
+        if len(assertion_range) < min_support:
+            return (-1, _EMPTY)
+
+    # update range based on connected assertions' returned updated domains
+    for connection in graph_pattern.connections[assertion_key]:
+        support, range_update = _memoized(_support_of_array,
+                                          cache,
+                                          graph_pattern,
+                                          connection,
+                                          assertion_range,
+                                          min_support,
+                                          memo)
+        if support < min_support:
+            return (-1, _EMPTY)
+
+        assertion_range = _intersect(assertion_range, range_update)
+
+        if len(assertion_range) < min_support:
+            return (-1, _EMPTY)
+
+    # update domain based on updated range
+    if isinstance(assertion, IdentityAssertion):
+        return (len(assertion_range), assertion_range)
+
+    backwards = cache.adjacency(assertion.predicate)['backwards']
+    assertion_domain_updated = _gather(backwards, assertion_range)
+
+    return (len(assertion_domain_updated), assertion_domain_updated)
+
+def _satisfy_head(cache, assertion, assertion_domain):
+    # members of the domain for which the assertion holds
+    backwards = cache.adjacency(assertion.predicate)['backwards']
+    if not isinstance(assertion.rhs, TypeVariable):
+        # either an entity or literal; P(e, u) holds
+        return _intersect(assertion_domain,
+                          _gather(backwards, np.array([assertion.rhs],
+                                                      dtype=np.int64)))
+
+    if isinstance(assertion.rhs, ObjectTypeVariable):
+        subjects, _ = cache.object_type_sets(assertion.predicate,
+                                             assertion.rhs.type)
+    elif isinstance(assertion.rhs, DataTypeVariable):
+        subjects, _ = cache.data_type_sets(assertion.predicate,
+                                           assertion.rhs.type)
+    elif isinstance(assertion.rhs, MultiModalNode):
+        _, resources = cache.data_type_sets(assertion.predicate,
+                                            assertion.rhs.type)
+        resources &= cache.literal_set(assertion.rhs)
+
+        return _intersect(assertion_domain,
+                          _gather(backwards, _ids(resources)))
+    else:
+        return _EMPTY
+
+    return _intersect(assertion_domain, _ids(subjects))
+
+def support_of_extension(cache,
+                         graph_pattern,
+                         endpoint,
+                         extension,
+                         extents,
+                         min_support):
+    """ Calculate Minimal Image-Based Support for a Clause body that extends
+    a parent body by a single leaf, from the extents of the parent
+
+    Extents map each assertion of the parent body onto its range and domain,
+    as found by support_of; the range of a leaf is only derived if the leaf
+    is extended. Only the path from the new leaf up to the identity is
+    evaluated, as the extents of all other branches still hold: these are
+    intersected with the ranges on the path. The support thresholds of the
+    other branches are therefore not checked again.
+
+    Returns -1 if support < min_support, and otherwise also the extents of
+    the extended body. Domains are BitSets.
+    """
+    extents = dict(extents)  # members are shared
+    parents = {hash(connection): assertion for assertions in
+               graph_pattern.distances.values() for assertion in assertions
+               for connection in graph_pattern.connections[hash(assertion)]}
+
+    # evaluate the new leaf on the range of its endpoint
+    assertion_range = _range_of(cache, endpoint, extents, parents) &\
+            cache.subject_set(extension.predicate)
+    if len(assertion_range) < min_support:
+        return (-1, BitSet(), None)
+
+    support, assertion_domain_updated = confidence_of(cache,
+                                                      extension,
+                                                      assertion_range)
+    if support < min_support:
+        return (-1, BitSet(), None)
+    extents[hash(extension)] = (None, assertion_domain_updated)
+
+    # walk up to the identity, narrowing each range on the path
+    assertion = endpoint
+    while True:
+        assertion_range &= assertion_domain_updated
+        if len(assertion_range) < min_support:
+            return (-1, BitSet(), None)
+
+        if isinstance(assertion, IdentityAssertion):
+            extents[hash(assertion)] = (assertion_range, assertion_range)
+
+            return (len(assertion_range), assertion_range, extents)
+
+        backwards = cache.predicate_map[assertion.predicate]['backwards']
+        assertion_domain_updated = BitSet(chain.from_iterable(backwards[resource]
+                                                              for resource in assertion_range))
+        if len(assertion_domain_updated) < min_support:
+            return (-1, BitSet(), None)
+        extents[hash(assertion)] = (assertion_range, assertion_domain_updated)
+
+        assertion = parents[hash(assertion)]
+        assertion_range = extents[hash(assertion)][0]
+
+def _range_of(cache, assertion, extents, parents):
+    # range of an assertion, derived from the range of its parent if a leaf
+    assertion_range, assertion_domain = extents[hash(assertion)]
+    if assertion_range is not None:
+        return assertion_range
+
+    assertion_domain &= extents[hash(parents[hash(assertion)])][0]
+    subjects, resources = cache.object_type_sets(assertion.predicate,
+                                                 assertion.rhs.type)
+    forwards = cache.predicate_map[assertion.predicate]['forwards']
+
+    return resources & BitSet(chain.from_iterable(forwards[entity] for entity in
+                                                  assertion_domain & subjects))
+
+def _memoized(evaluate, cache, graph_pattern, assertion, assertion_domain,
+              min_support, memo):
+    if memo is None:
+        return evaluate(cache, graph_pattern, assertion, assertion_domain,
+                        min_support, memo)
+
+    key = memo.key(graph_pattern, assertion, assertion_domain, min_support)
+    result = memo.get(key, assertion_domain)
+    if result is None:
+        result = evaluate(cache, graph_pattern, assertion, assertion_domain,
+                          min_support, memo)
+        memo.put(key, assertion_domain, result)
+
+    return result
+
+def _ids(bitset):
+    # same dtype as the CSR maps; mixing in uint64 would cast to float
+    return bitset.array().astype(np.int64, copy=False)
+
+def _intersect(a, b):
+    # both sorted and unique; IDs are dense, so a lookup table beats sorting
+    if len(a) <= 0 or len(b) <= 0:
+        return _EMPTY
+
+    return a[np.isin(a, b, assume_unique=True, kind='table')]
+
+def _unique(values):
+    # sorted and unique, by a mask over the ID range if that is dense enough
+    if len(values) <= 0:
+        return _EMPTY
+
+    upper = int(values.max())
+    if upper >= 8 * len(values):
+        return np.unique(values)
+
+    mask = np.zeros(upper + 1, dtype=bool)
+    mask[values] = True
+
+    return np.flatnonzero(mask)
+
+def _gather(csr, keys):
+    # union of the values of all keys, as sorted array
+    index_keys, offsets, values = csr
+    if len(keys) <= 0 or len(index_keys) <= 0:
+        return _EMPTY
+
+    positions = np.searchsorted(index_keys, keys)
+    found = positions < len(index_keys)
+    found[found] = index_keys[positions[found]] == keys[found]
+    positions = positions[found]
+
+    begins = offsets[positions]
+    lengths = offsets[positions + 1] - begins
+    if lengths.sum() <= 0:
+        return _EMPTY
+
+    # consecutive runs of values[begin:end], without a Python loop
+    shifts = np.repeat(begins - (np.cumsum(lengths) - lengths), lengths)
+
+    return _unique(values[np.arange(len(shifts)) + shifts])
+
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+
+class SupportMemo():
+    """ Support Memo class
+
+    Bounded memo of support_of results, evicting the least recently used
+    first. Each result is keyed by a canonical form of the sub-pattern rooted
+    at the evaluated assertion, which is the same for equal sub-patterns of
+    different bodies, and by a fingerprint of the domain it was evaluated
+    on. The domain itself is kept to rule out collisions.
+    """
+    maxsize = 0
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    _entries = None
+    _pattern = None
+    _pattern_hash = None
+    _forms = None
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+
+    def key(self, graph_pattern, assertion, assertion_domain, min_support):
+        """ Return the key of a sub-pattern and domain """
+        if graph_pattern is not self._pattern or\
+           hash(graph_pattern) != self._pattern_hash:
+            # all keys of one evaluation are of the same, unchanged, body
+            self._pattern = graph_pattern
+            self._pattern_hash = hash(graph_pattern)
+            self._forms = dict()
+
+        return (_canonical_form(graph_pattern, assertion, self._forms),
+                min_support,
+                len(assertion_domain),
+                _fingerprint(assertion_domain))
+
+    def get(self, key, assertion_domain):
+        """ Return the memoized result for a key, or None """
+        entry = self._entries.get(key)
+        if entry is None or not _same_domain(entry[0], assertion_domain):
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return entry[1]
+
+    def put(self, key, assertion_domain, result):
+        """ Add a result, evicting the least recently used if full """
+        if self.maxsize <= 0:
+            return
+
+        self._entries[key] = (assertion_domain, result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._pattern = None
+        self._pattern_hash = None
+        self._forms = None
+
+    def stats(self):
+        """ Return the number of hits, misses, and evictions """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        lookups = self.hits + self.misses
+        return "{} hits / {} lookups ({:0.1f}%), {} evicted".format(
+            self.hits,
+            lookups,
+            100 * self.hits / lookups if lookups > 0 else 0.0,
+            self.evictions)
+
+class NegativeMemo():
+    """ Negative Memo class
+
+    Bodies known to lack support. As support is anti-monotone, so does every
+    body which contains one of these, and extensions which lead to such a body
+    can be skipped without evaluating them. Bodies are kept as sets of edges
+    between assertions, with the identity left anonymous such that they apply
+    to all clauses of the same type. Each is indexed by the edge of the
+    extension that failed, which every body containing it must also have.
+    """
+    hits = 0
+
+    _patterns = None
+    _new = None
+    _body = None
+    _body_hash = None
+    _edges = None
+
+    def __init__(self):
+        self.hits = 0
+
+        self._patterns = dict()
+        self._new = list()
+
+    def edges(self, body):
+        """ Return the edges of a body """
+        if body is not self._body or hash(body) != self._body_hash:
+            # all lookups of one explored clause are of the same, unchanged, body
+            self._body = body
+            self._body_hash = hash(body)
+            self._edges = frozenset(_edge(body, endpoint, extension)
+                                    for endpoint in chain(*body.distances.values())
+                                    for extension in body.connections[hash(endpoint)])
+
+        return self._edges
+
+    def covers(self, body, endpoint, extension):
+        """ Return True if extending body leads to a known unsupported body """
+        patterns = self._patterns.get(_edge(body, endpoint, extension))
+        if patterns is None:
+            return False
+
+        edges = self.edges(body)
+        for pattern in patterns:
+            if pattern <= edges:
+                self.hits += 1
+
+                return True
+
+        return False
+
+    def add(self, body, endpoint, extension):
+        """ Add the body which results from an unsupported extension """
+        pattern = (_edge(body, endpoint, extension), self.edges(body))
+        if self._insert(pattern):
+            self._new.append(pattern)
+
+    def update(self, patterns):
+        """ Add patterns as returned by pending() """
+        for pattern in patterns:
+            self._insert(pattern)
+
+    def pending(self):
+        """ Return and forget the patterns added since the last call """
+        patterns, self._new = self._new, list()
+
+        return patterns
+
+    def _insert(self, pattern):
+        edge, edges = pattern
+        if edge not in self._patterns.keys():
+            self._patterns[edge] = set()
+        elif edges in self._patterns[edge]:
+            return False
+
+        self._patterns[edge].add(edges)
+
+        return True
+
+    def clear(self):
+        self._patterns.clear()
+        self._new = list()
+        self._body = None
+        self._body_hash = None
+        self._edges = None
+
+    def __len__(self):
+        return sum(len(patterns) for patterns in self._patterns.values())
+
+    def __str__(self):
+        return "{} patterns, {} hits".format(len(self), self.hits)
+
+def _edge(body, endpoint, extension):
+    # identities differ between clauses of the same type
+    if hash(endpoint) == hash(body.identity):
+        return (None, hash(extension))
+
+    return (hash(endpoint), hash(extension))
+
+def _canonical_form(graph_pattern, assertion, forms):
+    # independent of the assertions' identities and of the order of siblings
+    key = hash(assertion)
+    if key not in forms.keys():
+        rhs = assertion.rhs
+        if isinstance(rhs, TypeVariable):
+            rhs = (type(rhs).__name__, rhs.type)
+
+        children = [_canonical_form(graph_pattern, connection, forms)
+                    for connection in graph_pattern.connections[key]]
+        forms[key] = (type(assertion).__name__,
+                      assertion.predicate,
+                      rhs,
+                      tuple(sorted(children, key=hash)))
+
+    return forms[key]
+
+def _fingerprint(assertion_domain):
+    if isinstance(assertion_domain, np.ndarray):
+        return hash(assertion_domain.tobytes())
+
+    return hash(assertion_domain)
+
+def _same_domain(a, b):
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray):
+        return np.array_equal(a, b)
+
+    return a == b
+
+# support and confidence functions by name
+ENGINES = {"python": (support_of, confidence_of),
+           "numpy": (support_of_vectorized, confidence_of_vectorized)}
@@ -0,0 +1,200 @@
+#! /usr/bin/env python
+
+import bz2
+import gzip
+import os
+import re
+from uuid import uuid4
+
+from rdflib.term import BNode, Literal, URIRef
+from rdflib.util import guess_format as rdflib_guess_format
+
+
+NTRIPLES_FORMATS = {'nt', 'nt11', 'ntriples', 'nquads'}
+
+_COMPRESSION_SUFFIXES = ['.gz', '.bz2']
+
+_IRI = r'<([^>]*)>'
+_BNODE = r'_:([^\s<>"]*[^\s<>".])'
+_LITERAL = r'"((?:[^"\\]|\\.)*)"(?:@([a-zA-Z]+(?:-[a-zA-Z0-9]+)*)|\^\^<([^>]*)>)?'
+
+# groups: subject (2), predicate (1), object (5), graph label (2)
+_STATEMENT = re.compile(r'\s*(?:{0}|{1})\s*{0}\s*(?:{0}|{1}|{2})\s*'
+                        r'(?:(?:{0}|{1})\s*)?\.\s*(?:#.*)?$'.format(_IRI,
+                                                                    _BNODE,
+                                                                    _LITERAL))
+_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+_ESCAPE_CHARS = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f',
+                 '"': '"', "'": "'", '\\': '\\'}
+
+def guess_format(path):
+    """ Guess the serialization format of a possibly compressed file """
+    for suffix in _COMPRESSION_SUFFIXES:
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+            break
+
+    return rdflib_guess_format(path)
+
+def open_compressed(path, mode='rt'):
+    """ Open a plain, gzip, or bzip2 compressed file
+
+    The compression is inferred from the magic number rather than from the
+    file extension.
+    """
+    compression = _compression(path)
+    if compression == 'gzip':
+        opener = gzip.open
+    elif compression == 'bzip2':
+        opener = bz2.open
+    else:
+        opener = open
+
+    if 't' in mode:
+        return opener(path, mode, encoding='utf-8')
+
+    return opener(path, mode)
+
+def read_ntriples(path, start=0, end=None, bnode_prefix=None):
+    """ Yield all triples in an N-Triples or N-Quads file as RDF terms
+
+    The file is read line by line and the triples are never stored, such that
+    memory usage is independent of the size of the file. Graph labels of
+    quads are ignored. Blank node labels are scoped to the file, unless a
+    prefix is given to share them between several reads.
+
+    If start or end are given, only the lines that begin within that byte
+    range are read, which allows a file to be read in chunks. This requires
+    an uncompressed file.
+    """
+    if bnode_prefix is None:
+        # unique per file, similar to rdflib's parsers
+        bnode_prefix = uuid4().hex[:8]
+
+    with open_compressed(path, 'rb') as f:
+        pos = start
+        if start > 0:
+            # skip the remainder of the line that belongs to the previous chunk
+            f.seek(start - 1)
+            pos += len(f.readline()) - 1
+
+        while end is None or pos < end:
+            line = f.readline()
+            if len(line) <= 0:
+                break
+
+            offset = pos
+            pos += len(line)
+
+            line = line.decode('utf-8').strip()
+            if len(line) <= 0 or line.startswith('#'):
+                continue
+
+            triple = _parse_statement(line, bnode_prefix)
+            if triple is None:
+                raise ValueError("Invalid statement at byte {} of {}: {}".format(offset,
+                                                                                path,
+                                                                                line))
+
+            yield triple
+
+def read_delta(path):
+    """ Return the triples to add and to remove according to a delta file
+
+    Each line of a delta holds an N-Triples statement preceded by a '+' if
+    the triple is to be added, or by a '-' if it is to be removed. Blank
+    nodes are scoped to the delta.
+    """
+    bnode_prefix = uuid4().hex[:8]
+
+    additions = list()
+    removals = list()
+    with open_compressed(path, 'rt') as f:
+        for i, line in enumerate(f, 1):
+            line = line.strip()
+            if len(line) <= 0 or line.startswith('#'):
+                continue
+
+            triple = None
+            if line[0] in '+-':
+                triple = _parse_statement(line[1:], bnode_prefix)
+            if triple is None:
+                raise ValueError("Invalid delta on line {} of {}: {}".format(i,
+                                                                            path,
+                                                                            line))
+
+            if line[0] == '+':
+                additions.append(triple)
+            else:
+                removals.append(triple)
+
+    return (additions, removals)
+
+def split_ntriples(path, num_chunks, min_size=2**26):
+    """ Return byte ranges to read an N-Triples or N-Quads file in chunks
+
+    Compressed files cannot be split, and neither are chunks made smaller
+    than min_size bytes.
+    """
+    if _compression(path) is not None:
+        return [(0, None)]
+
+    size = os.path.getsize(path)
+    num_chunks = max(1, min(num_chunks, size // min_size))
+    boundaries = [i * size // num_chunks for i in range(num_chunks)] + [None]
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def _parse_statement(line, bnode_prefix):
+    m = _STATEMENT.match(line)
+    if m is None:
+        return None
+
+    (s_iri, s_bnode, p_iri, o_iri, o_bnode, o_lexical, o_language,
+     o_datatype) = m.group(1, 2, 3, 4, 5, 6, 7, 8)
+
+    if s_iri is not None:
+        s = URIRef(_unescape(s_iri))
+    else:
+        s = BNode(bnode_prefix + s_bnode)
+
+    p = URIRef(_unescape(p_iri))
+
+    if o_iri is not None:
+        o = URIRef(_unescape(o_iri))
+    elif o_bnode is not None:
+        o = BNode(bnode_prefix + o_bnode)
+    else:
+        o = Literal(_unescape(o_lexical),
+                    lang=o_language,
+                    datatype=None if o_datatype is None
+                             else URIRef(_unescape(o_datatype)))
+
+    return (s, p, o)
+
+def _compression(path):
+    with open(path, 'rb') as f:
+        magic = f.read(3)
+
+    if magic[:2] == b'\x1f\x8b':
+        return 'gzip'
+    if magic == b'BZh':
+        return 'bzip2'
+
+    return None
+
+def _unescape(value):
+    if '\\' not in value:
+        return value
+
+    return _ESCAPE.sub(_unescape_match, value)
+
+def _unescape_match(m):
+    code_short, code_long, char = m.groups()
+    if char is not None:
+        if char not in _ESCAPE_CHARS.keys():
+            raise ValueError("Invalid escape sequence: \\" + char)
+
+        return _ESCAPE_CHARS[char]
+
+    return chr(int(code_short if code_short is not None else code_long, 16))
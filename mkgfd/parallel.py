@@ -1,23 +1,34 @@
 #! /usr/bin/env python
 
-from math import ceil
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import Manager
+from queue import Queue
+import os
+import pickle
+from shutil import rmtree
+from tempfile import mkdtemp
 from time import time
+from uuid import uuid4
 
 from pathos.pools import ProcessPool
-from rdflib.namespace import RDF, RDFS, XSD
+from rdflib.namespace import RDF, RDFS
 from rdflib.graph import Literal, URIRef
 
+from mkgfd.mapped import MappedCache, save_mapped
+from mkgfd.metrics import NegativeMemo, SupportMemo
 from mkgfd.structures import (Clause, TypeVariable,
                             DataTypeVariable, MultiModalNode,
                             MultiModalDateFragNode, MultiModalDateTimeNode,
                             MultiModalNumericNode, MultiModalStringNode,
-                            ObjectTypeVariable, GenerationForest, GenerationTree)
-from mkgfd.cache import Cache
+                            ObjectTypeVariable, GenerationForest, GenerationTree,
+                            ColumnarGenerationTree)
 from mkgfd.sequential import (explore, new_clause, new_multimodal_clause,
                         new_variable_clause, map_resources,
-                        map_predicate_object_pairs)
+                        map_predicate_object_pairs, release)
 from mkgfd.multimodal import (cluster, SUPPORTED_XSD_TYPES, XSD_DATEFRAG,
                         XSD_DATETIME, XSD_NUMERIC, XSD_STRING)
+from mkgfd.utils import decode_generation_forest
 
 
 
@@ -25,106 +36,211 @@ from mkgfd.multimodal import (cluster, SUPPORTED_XSD_TYPES, XSD_DATEFRAG,
 IGNORE_PREDICATES = {RDF.type, RDFS.label}
 IDENTITY = URIRef("local://identity")  # reflexive property
 
-def generate_mp(nproc, g, depths, min_support, min_confidence, p_explore, p_extend,
-             valprep, prune, mode, max_length_body, max_width, multimodal):
+def generate_mp(nproc, cache, depths, min_support, min_confidence, p_explore, p_extend,
+             valprep, prune, mode, max_length_body, max_width, multimodal,
+             engine="python", memo_size=4096, share_memo=False,
+             incremental=False, frontier="bfs", frontier_size=0,
+             columnar=False, lean=False, mapped=False):
     """ Generate all clauses up to and including a maximum depth which satisfy a minimal
     support and confidence.
+
+    The engine, one of ENGINES, determines how support and confidence are
+    evaluated. Support of sub-patterns is memoized in a SupportMemo of at most
+    memo_size entries (none if 0), either per explored clause or, if
+    share_memo, per worker, type, and depth. If incremental, clauses keep the
+    extents of their body until their children are generated, and support is
+    evaluated from those instead. Bodies which lack support are shared by all
+    workers per type and depth, such that extensions which contain them are
+    skipped. Clauses are explored in the order of frontier, one of FRONTIERS,
+    until it holds frontier_size clauses, after which further ones are
+    explored depth-first (unbounded if 0). If columnar, clauses are stored in
+    ColumnarGenerationTrees. If lean, clauses which won't be extended anymore,
+    such as those of the last depth, only keep a digest of their extents, also
+    when returned by the workers.
+
+    The Cache is inherited by workers, which are forked once it is shared,
+    rather than sent along with every task, and which are closed together
+    with their copy once done. If mapped, workers share a single copy of it as
+    MappedCache instead. Types are mined concurrently, with each depth of a
+    type being explored as soon as its previous depth is done.
     """
-    cache = Cache(g)
-    with ProcessPool(nproc) as pool:
+    # a new pool is created after the cache is shared, such that its forked
+    # workers inherit it, and closed once done, such that they release it
+    with _shared_cache(cache, mapped) as cache_ref, _process_pool(nproc) as pool,\
+         Manager() as manager:
         t0 = time()
-        generation_forest = init_generation_forest_mp(pool, nproc, g, cache.object_type_map,
+        generation_forest = init_generation_forest_mp(pool, nproc, cache,
+                                                      cache_ref,
                                                       min_support, min_confidence,
-                                                      mode, multimodal)
+                                                      mode, multimodal,
+                                                      columnar)
 
         mode_skip_dict = dict()
         npruned = 0
-        for depth in range(0, depths.stop):
-            print("generating depth {} / {}".format(depth+1, depths.stop))
-            for ctype in generation_forest.types():
-                print(" type {}".format(ctype), end=" ")
-
-                prune_set = set()
-                nclauses = 0
-                for phi in generation_forest.get_tree(ctype).get(depth):
-                    if depth == 0:
-                        if ctype not in mode_skip_dict.keys():
-                            mode_skip_dict[ctype] = set()
-
-                        if mode[0] != mode[1] and \
-                        (mode[0] == "A" and isinstance(phi.head.rhs, TypeVariable) or
-                        mode[0] == "T" and not isinstance(phi.head.rhs, TypeVariable)):
-                            # skip clauses with Abox or Tbox heads to filter
-                            # exploration on the remainder from depth 0 and 'up'
-                            mode_skip_dict[ctype].add(phi)
-                            continue
-
-                    elif len(phi.body) >= max_length_body:
-                        continue
-
-                    # calculate n without storing the whole set in memory
-                    nclauses += 1
-
-                E = set()
-                if nclauses >= 1:
-                    chunksize = ceil(nclauses/nproc)
-                    for psi in pool.uimap(generate_depth_mp,
-                                         ((phi,
-                                           generate_candidates(phi,
-                                                               generation_forest,
-                                                               mode,
-                                                               depth),
-                                           depth,
-                                           cache,
-                                           prune,
-                                           min_support,
-                                           min_confidence,
-                                           p_explore,
-                                           p_extend,
-                                           valprep,
-                                           mode,
-                                           max_length_body,
-                                           max_width)
-                                          for phi in generation_forest.get_tree(ctype).get(depth)
-                                          if phi not in mode_skip_dict[ctype]
-                                          and len(phi.body) < max_length_body),
-                                         chunksize=chunksize if chunksize > 1 else 2):
-                        E.update(psi)
-
-                for clause in generation_forest.get_tree(ctype).get(depth):
-                    # clear domain of clause (which we won't need anymore) to save memory
-                    clause._satisfy_body = None
-                    clause._satisfy_full = None
-
-                    if prune and depth > 0 and clause._prune is True:
-                        prune_set.add(clause)
-
-                # prune clauses after generating children to still allow for complex children
-                if prune:
-                    generation_forest.prune(ctype, depth, prune_set)
-                    npruned += len(prune_set)
 
-                    # prune children in last iteration
-                    if depth == depths.stop-1:
-                        prune_set = set()
-                        for derivative in E:
-                            if derivative._prune is True:
-                                prune_set.add(derivative)
+        # units of work are (type, depth): those of the same type depend on
+        # each other in order of depth, but not on those of other types, as
+        # candidates are the heads of depth 0, which are complete by now. Units
+        # run concurrently, and each next depth is submitted as soon as the
+        # previous one is done.
+        ready = Queue()  # tasks, until None
+        units = dict()  # (type, depth) -> [E, number of tasks left, busy,
+                        #                  negatives]
+        busy = dict()  # busy time per worker, over all units
+        nactive = len(generation_forest.types())
+
+        def submit(ctype, depth):
+            tasks = list()
+            for phi in generation_forest.get_tree(ctype).get(depth):
+                if depth == 0:
+                    if ctype not in mode_skip_dict.keys():
+                        mode_skip_dict[ctype] = set()
+
+                    if mode[0] != mode[1] and \
+                    (mode[0] == "A" and isinstance(phi.head.rhs, TypeVariable) or
+                    mode[0] == "T" and not isinstance(phi.head.rhs, TypeVariable)):
+                        # skip clauses with Abox or Tbox heads to filter
+                        # exploration on the remainder from depth 0 and 'up'
+                        mode_skip_dict[ctype].add(phi)
+                        continue
 
-                        E -= prune_set
-                        npruned += len(prune_set)
+                if len(phi.body) >= max_length_body:
+                    continue
 
-                print("(+{} added)".format(len(E)))
+                C = generate_candidates(phi, generation_forest, mode, depth)
+                tasks.append((explore_cost(phi, C), phi, C))
+
+            # unsupported bodies found by any of the workers; the key tells
+            # workers apart from those of earlier runs. Kept with the unit, as
+            # the shared list is gone once no longer referenced
+            negatives = ((ctype, depth, t0), manager.list())\
+                    if len(tasks) > 0 else None
+
+            units[(ctype, depth)] = [set(), len(tasks), dict(), negatives]
+            if len(tasks) <= 0:
+                finish(ctype, depth)
+
+                return
+
+            # schedule the most expensive first and one at a time, such that
+            # workers which are done take over the rest rather than wait for
+            # a single large chunk
+            tasks.sort(key=lambda task: task[0], reverse=True)
+            for _, phi, C in tasks:
+                ready.put((phi,
+                           C,
+                           depth,
+                           cache_ref,
+                           prune,
+                           min_support,
+                           min_confidence,
+                           p_explore,
+                           p_extend,
+                           valprep,
+                           mode,
+                           max_length_body,
+                           max_width,
+                           engine,
+                           memo_size,
+                           share_memo,
+                           incremental,
+                           negatives,
+                           frontier,
+                           frontier_size,
+                           lean,
+                           depth == depths.stop-1))
+
+        def finish(ctype, depth):
+            nonlocal npruned, nactive
+            E, _, unit_busy, _ = units.pop((ctype, depth))
+
+            prune_set = set()
+            for clause in generation_forest.get_tree(ctype).get(depth):
+                # clear domain of clause (which we won't need anymore) to save memory
+                clause._satisfy_body = None
+                clause._satisfy_full = None
+                clause._extents = None
+
+                if prune and depth > 0 and clause._prune is True:
+                    prune_set.add(clause)
+
+            # prune clauses after generating children to still allow for complex children
+            if prune:
+                generation_forest.prune(ctype, depth, prune_set)
+                npruned += len(prune_set)
+
+                # prune children in last iteration
+                if depth == depths.stop-1:
+                    prune_set = set()
+                    for derivative in E:
+                        if derivative._prune is True:
+                            prune_set.add(derivative)
+
+                    E -= prune_set
+                    npruned += len(prune_set)
 
-                # remove clauses after generating children if we are
-                # not interested in previous depth
-                if depth > 0 and depth not in depths:
-                    n0 = generation_forest.get_tree(ctype).size
-                    generation_forest.clear(ctype, depth)
+            print(" type {}, depth {} / {} (+{} added)".format(cache.decode(ctype),
+                                                              depth+1,
+                                                              depths.stop,
+                                                              len(E)))
+            if len(unit_busy) > 0:
+                print("  worker busy: {}".format(", ".join(
+                    "{:0.2f}s".format(b) for b in sorted(unit_busy.values(),
+                                                         reverse=True))))
+
+            if depth == depths.stop-1:
+                # no children left to generate
+                for chi in E:
+                    chi._extents = None
+                    if lean:
+                        release(chi)
+
+            # remove clauses after generating children if we are
+            # not interested in previous depth
+            if depth > 0 and depth not in depths:
+                n0 = generation_forest.get_tree(ctype).size
+                generation_forest.clear(ctype, depth)
 
-                    npruned += n0 - generation_forest.get_tree(ctype).size
+                npruned += n0 - generation_forest.get_tree(ctype).size
 
-                generation_forest.update_tree(ctype, E, depth+1)
+            generation_forest.update_tree(ctype, E, depth+1)
+
+            if depth+1 < depths.stop:
+                submit(ctype, depth+1)
+            else:
+                nactive -= 1
+                if nactive <= 0:
+                    ready.put(None)
+
+        print("generating {} depths of {} types".format(depths.stop,
+                                                        nactive))
+        t1 = time()
+        try:
+            if nactive <= 0 or depths.stop <= 0:
+                ready.put(None)
+            else:
+                for ctype in list(generation_forest.types()):
+                    submit(ctype, 0)
+
+            for key, psi, (pid, duration) in pool.uimap(generate_depth_mp,
+                                                        _drain(ready),
+                                                        chunksize=1):
+                unit = units[key]
+                unit[0].update(psi)
+                unit[1] -= 1
+                unit[2][pid] = unit[2].get(pid, 0.0) + duration
+                busy[pid] = busy.get(pid, 0.0) + duration
+
+                if unit[1] <= 0:
+                    finish(*key)
+        finally:
+            # never leave the pool waiting for more tasks
+            ready.put(None)
+
+        if len(busy) > 0:
+            print("worker load (busy / idle): {}".format(worker_load(busy,
+                                                                     time()-t1,
+                                                                     nproc)))
 
         if len(mode_skip_dict) > 0:
             # prune unwanted clauses at depth 0 now that we don't need them anymore
@@ -149,7 +265,33 @@ def generate_mp(nproc, g, depths, min_support, min_confidence, p_explore, p_exte
         else:
             print()
 
-    return generation_forest
+    return decode_generation_forest(generation_forest, cache)
+
+def explore_cost(phi, C):
+    """ Estimate the cost of exploring a clause, relative to that of others:
+    every candidate is evaluated on the domain of the clause, and the deeper
+    the body, the more work each evaluation takes
+    """
+    return phi.support * len(C) * len(phi.body)
+
+def _drain(queue):
+    # yield from a queue until None
+    while True:
+        task = queue.get()
+        if task is None:
+            return
+
+        yield task
+
+def worker_load(busy, duration, nproc):
+    """ Describe the busy and idle time of each worker over a duration, given
+    the busy time per worker which got tasks
+    """
+    busy = sorted(busy.values(), reverse=True)
+    busy.extend([0.0] * (nproc - len(busy)))
+
+    return ", ".join("{:0.2f}s / {:0.2f}s".format(b, max(duration - b, 0.0))
+                     for b in busy)
 
 def generate_candidates(phi, generation_forest, mode, depth):
     C = set()
@@ -181,31 +323,156 @@ def generate_candidates(phi, generation_forest, mode, depth):
     return C
 
 def generate_depth_mp(inputs):
-    phi, C, depth, cache, prune, min_support, min_confidence, \
-    p_explore, p_extend, valprep, mode, max_length_body, max_width = inputs
-
-    return explore(phi,
-                   C,
-                   depth,
-                   cache,
-                   prune,
-                   min_support,
-                   min_confidence,
-                   p_explore,
-                   p_extend,
-                   valprep,
-                   mode,
-                   max_length_body,
-                   max_width)
-
-
-def init_generation_forest_mp(pool, nproc, g, class_instance_map, min_support,
-                              min_confidence, mode, multimodal):
+    phi, C, depth, cache_ref, prune, min_support, min_confidence, \
+    p_explore, p_extend, valprep, mode, max_length_body, max_width, engine, \
+    memo_size, share_memo, incremental, (negatives_key, shared_negatives), \
+    frontier, frontier_size, lean, final = inputs
+
+    t0 = time()
+    cache = _worker_cache(*cache_ref)
+
+    memo = None
+    if share_memo and memo_size > 0:
+        memo = _worker_memo((phi.body.identity.rhs.type, depth), memo_size)
+    elif memo_size > 0:
+        memo = SupportMemo(memo_size)
+
+    negatives = _worker_negatives(negatives_key, shared_negatives)
+
+    E = explore(phi,
+                C,
+                depth,
+                cache,
+                prune,
+                min_support,
+                min_confidence,
+                p_explore,
+                p_extend,
+                valprep,
+                mode,
+                max_length_body,
+                max_width,
+                engine,
+                memo,
+                incremental,
+                negatives,
+                frontier,
+                frontier_size,
+                lean,
+                final)
+
+    # share what we found with the other workers
+    shared_negatives.extend(negatives.pending())
+
+    return ((phi.body.identity.rhs.type, depth), E, (os.getpid(), time()-t0))
+
+# memos kept by a worker for the types and depths it most recently got clauses
+# of; several, as clauses of different types and depths are interleaved
+_WORKER_UNITS = 4
+_memos = OrderedDict()
+
+def _worker_memo(key, memo_size):
+    memo = _memos.pop(key, None)
+    if memo is None:
+        memo = SupportMemo(memo_size)
+    _memos[key] = memo
+
+    while len(_memos) > _WORKER_UNITS:
+        _memos.popitem(last=False)
+
+    return memo
+
+@contextmanager
+def _process_pool(nproc):
+    """ Yield a new pool of nproc processes, rather than the one pathos keeps
+    for reuse by any pool of as many processes, and close it on exit
+    """
+    pool = ProcessPool(nproc, id=uuid4().hex)
+    try:
+        yield pool
+    finally:
+        pool.clear()
+
+# cache kept by a worker for as long as it gets tasks with the same key
+_SHM_DIR = "/dev/shm"
+_cache = None
+_cache_key = None
+
+@contextmanager
+def _shared_cache(cache, mapped=False):
+    """ Share a cache with workers by writing it to a temporary file once,
+    from which each worker loads it on its first task. Workers forked within
+    this context inherit it instead. Yields a reference to pass to tasks.
+
+    If mapped, the cache is written as arrays to shared memory if available,
+    and every worker maps these as MappedCache rather than loading a copy.
+    """
+    global _cache, _cache_key
+    _cache, _cache_key = cache, uuid4().hex
+
+    tmpdir = mkdtemp(prefix="mkgfd-cache-",
+                     dir=_SHM_DIR if mapped and os.path.isdir(_SHM_DIR)
+                     else None)
+    try:
+        if mapped:
+            path = os.path.join(tmpdir, "cache")
+            save_mapped(cache, path)
+
+            # forked workers inherit the mapping rather than the maps
+            _cache = MappedCache(path)
+        else:
+            path = os.path.join(tmpdir, "cache.pkl")
+            with open(path, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        yield (_cache_key, path)
+    finally:
+        _cache, _cache_key = None, None
+        rmtree(tmpdir, ignore_errors=True)
+
+def _worker_cache(key, path):
+    global _cache, _cache_key
+    if _cache is None or _cache_key != key:
+        if os.path.isdir(path):
+            _cache = MappedCache(path)
+        else:
+            with open(path, 'rb') as f:
+                _cache = pickle.load(f)
+        _cache_key = key
+
+    return _cache
+
+# unsupported bodies kept by a worker for the types and depths it most recently
+# got clauses of, with how many of those shared by all workers it has seen
+_negatives = OrderedDict()
+
+def _worker_negatives(key, shared):
+    negatives, seen = _negatives.pop(key, (None, 0))
+    if negatives is None:
+        negatives = NegativeMemo()
+
+    # catch up with what the other workers found since
+    patterns = shared[seen:]
+    negatives.update(patterns)
+    _negatives[key] = (negatives, seen + len(patterns))
+
+    while len(_negatives) > _WORKER_UNITS:
+        _negatives.popitem(last=False)
+
+    return negatives
+
+
+def init_generation_forest_mp(pool, nproc, cache, cache_ref, min_support,
+                              min_confidence, mode, multimodal, columnar=False):
     """ Initialize the generation forest by creating all generation trees of
     types which satisfy minimal support and confidence.
+
+    Trees are seeded by the workers from their own Cache, such that tasks
+    only carry the type and a reference to the Cache.
     """
     print("initializing Generation Forest")
     generation_forest = GenerationForest()
+    class_instance_map = cache.object_type_map
 
     types = list()
     for t in class_instance_map['type-to-object'].keys():
@@ -213,23 +480,27 @@ def init_generation_forest_mp(pool, nproc, g, class_instance_map, min_support,
         # any pattern of this type will not either
         support = len(class_instance_map['type-to-object'][t])
         if support >= min_support:
-            print(" initializing Generation Tree for type {}...".format(str(t)))
-            types.append(t)
+            types.append((support, t))
+
+    # largest types first, one per task, as their trees take longest to seed
+    types = [t for _, t in sorted(types, key=lambda x: x[0], reverse=True)]
+    position = {t: i for i, t in enumerate(types)}
+    for t in types:
+        print(" initializing Generation Tree for type {}...".format(str(cache.decode(t))))
 
-    chunksize = ceil(len(types)/nproc)
     for t, tree in pool.uimap(init_generation_tree_mp,
                               ((t,
-                                g,
-                                class_instance_map,
+                                cache_ref,
                                 min_support,
                                 min_confidence,
                                 mode,
-                                multimodal) for t in types),
-                               chunksize=chunksize if chunksize > 1 else 2):
+                                multimodal,
+                                columnar) for t in types),
+                               chunksize=1):
 
-        offset = len(types)-types.index(t)
+        offset = len(types)-position[t]
         print("\033[F"*offset, end="")
-        print(" initialized Generation Tree for type {} (+{} added)".format(str(t),
+        print(" initialized Generation Tree for type {} (+{} added)".format(str(cache.decode(t)),
                                                                             tree.size))
         if offset-1 > 0:
             print("\033[E"*(offset-1), end="")
@@ -242,7 +513,9 @@ def init_generation_forest_mp(pool, nproc, g, class_instance_map, min_support,
     return generation_forest
 
 def init_generation_tree_mp(inputs):
-    t, g, class_instance_map, min_support, min_confidence, mode, multimodal = inputs
+    t, cache_ref, min_support, min_confidence, mode, multimodal, columnar = inputs
+    cache = _worker_cache(*cache_ref)
+    class_instance_map = cache.object_type_map
 
     # don't generate what we won't need
     generate_Abox_heads = True
@@ -252,15 +525,17 @@ def init_generation_tree_mp(inputs):
     elif mode == "TT":
         generate_Abox_heads = False
 
+    class_instances = cache.instance_set(t)
+
     # gather all predicate-object pairs belonging to the members of a type
-    predicate_object_map = map_predicate_object_pairs(g, class_instance_map['type-to-object'][t])
+    predicate_object_map = map_predicate_object_pairs(cache, class_instances)
 
     # create shared variables
     parent = Clause(head=True, body={})
     var = ObjectTypeVariable(type=t)
 
     # generate clauses for each predicate-object pair
-    generation_tree = GenerationTree()
+    generation_tree = ColumnarGenerationTree() if columnar else GenerationTree()
     for p in predicate_object_map.keys():
         pfreq = sum(predicate_object_map[p].values())
         if pfreq < min_support:
@@ -276,14 +551,11 @@ def init_generation_tree_mp(inputs):
         for o in predicate_object_map[p].keys():
             if generate_Tbox_heads:
                 # map resources to types for unbound type generation
-                map_resources(g, p, o, class_instance_map['type-to-object'][t],
+                map_resources(cache, p, o, class_instances,
                               object_types_map, data_types_map)
 
-            if multimodal and type(o) is Literal:
-                dtype = o.datatype
-                if dtype is None:
-                    dtype = XSD.string if o.language != None else XSD.anyType
-
+            if multimodal and type(cache.decode(o)) is Literal:
+                dtype = cache.data_type_map['object-to-type'][o]
                 if dtype not in SUPPORTED_XSD_TYPES:
                     # skip if not supported
                     continue
@@ -302,8 +574,8 @@ def init_generation_tree_mp(inputs):
             #    continue
 
             # create new clause
-            phi = new_clause(g, parent, var, p, o,
-                             class_instance_map['type-to-object'][t],
+            phi = new_clause(cache, parent, var, p, o,
+                             class_instances,
                              pfreq, min_confidence)
             if phi is not None:
                 generation_tree.add(phi, depth=0)
@@ -317,7 +589,7 @@ def init_generation_tree_mp(inputs):
 
                 var_o = ObjectTypeVariable(type=ctype)
                 phi = new_variable_clause(parent, var, p, var_o,
-                                          class_instance_map['type-to-object'][t],
+                                          class_instances,
                                           object_types_map[ctype], pfreq, min_confidence)
 
                 if phi is not None:
@@ -330,7 +602,7 @@ def init_generation_tree_mp(inputs):
 
                 var_o = DataTypeVariable(type=dtype)
                 phi = new_variable_clause(parent, var, p, var_o,
-                                          class_instance_map['type-to-object'][t],
+                                          class_instances,
                                           data_types_map[dtype], pfreq, min_confidence)
 
                 if phi is not None:
@@ -346,7 +618,8 @@ def init_generation_tree_mp(inputs):
                     continue
 
                 # determine clusters per xsd type
-                values_sets = cluster(data_types_values_map[dtype],
+                values_sets = cluster([cache.decode(o) for o in
+                                       data_types_values_map[dtype]],
                                       dtype)
                 nsets = len(values_sets)
                 if nsets <= 0 or nvalues/nsets < min_confidence:
@@ -370,9 +643,9 @@ def init_generation_tree_mp(inputs):
                                                        value_set))
 
                 for node in nodes:
-                    phi = new_multimodal_clause(g, parent, var, p, node, dtype,
+                    phi = new_multimodal_clause(cache, parent, var, p, node, dtype,
                                                 data_types_values_map,
-                                                class_instance_map['type-to-object'][t],
+                                                class_instances,
                                                 pfreq, min_confidence)
 
                     if phi is not None:
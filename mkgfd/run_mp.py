@@ -7,9 +7,7 @@ import pickle
 from time import time
 from sys import maxsize
 
-from rdflib import Graph
-from rdflib.util import guess_format
-
+from mkgfd.ingest import load_cache
 from mkgfd.parallel import generate_mp
 from mkgfd.ui import _LEFTARROW, _PHI, generate_label_map, pretty_clause
 from mkgfd.utils import integerRangeArg
@@ -31,6 +29,8 @@ if __name__ == "__main__":
             choices = ["tsv", "pkl"], default="tsv")
     parser.add_argument("-i", "--input", help="One or more RDF-encoded graphs",
             required=True, nargs='+')
+    parser.add_argument("--delta", help="One or more deltas to apply to the graphs, in order",
+            required=False, nargs='+', default=[])
     parser.add_argument("--max_size", help="Maximum context size",
             required=False, default=maxsize)
     parser.add_argument("--max_width", help="Maximum width of shell",
@@ -39,6 +39,26 @@ if __name__ == "__main__":
             choices = ["AA", "AT", "TA", "TT", "AB", "BA", "TB", "BT", "BB"], default="BB")
     parser.add_argument("--multimodal", help="Enable multimodal support",
             required=False, action='store_true')
+    parser.add_argument("--engine", help="Evaluate support and confidence per entity (python) or vectorized (numpy)",
+            choices = ["python", "numpy"], default="python")
+    parser.add_argument("--memo_size", help="Maximum number of memoized sub-pattern evaluations (0 to disable)",
+            required=False, default=4096)
+    parser.add_argument("--share_memo", help="Share memoized evaluations per type and depth",
+            required=False, action='store_true')
+    parser.add_argument("--incremental", help="Evaluate support from the extents of the parent clause",
+            required=False, action='store_true')
+    parser.add_argument("--frontier", help="Order in which to explore clauses",
+            choices = ["bfs", "dfs", "best"], default="bfs")
+    parser.add_argument("--frontier_size", help="Number of clauses waiting to be explored beyond which they are explored depth-first (0 for unbounded)",
+            required=False, default=0)
+    parser.add_argument("--columnar", help="Store generation trees column-wise",
+            required=False, action='store_true')
+    parser.add_argument("--lean", help="Only keep a digest of the extents of clauses which won't be extended anymore",
+            required=False, action='store_true')
+    parser.add_argument("--mapped", help="Share a single memory-mapped copy of the graph index between workers",
+            required=False, action='store_true')
+    parser.add_argument("--snapshot_dir", help="Directory to store and reuse index snapshots",
+            required=False, default=None)
     parser.add_argument("--p_explore", help="Probability of exploring candidate endpoint",
             required=False, default=1.0)
     parser.add_argument("--p_extend", help="Probability of extending at endpoint",
@@ -55,9 +75,8 @@ if __name__ == "__main__":
 
     # load graph(s)
     print("importing graphs...", end=" ")
-    g = Graph()
-    for gf in args.input:
-        g.parse(gf, format=guess_format(gf))
+    cache = load_cache(args.input, args.snapshot_dir, int(args.nproc),
+                       args.delta)
     print("done")
 
     # only makes sense when using pkl output
@@ -65,12 +84,17 @@ if __name__ == "__main__":
         args.valopt = False
 
     # compute clauses
-    f = generate_mp(int(args.nproc), g, args.depth,
+    f = generate_mp(int(args.nproc), cache, args.depth,
                    int(args.min_support), int(args.min_confidence),
                    float(args.p_explore), float(args.p_extend),
                    args.valopt, not args.noprune, args.mode,
                    int(args.max_size), int(args.max_width),
-                   args.multimodal)
+                   args.multimodal,
+                   args.engine,
+                   int(args.memo_size), args.share_memo,
+                   args.incremental,
+                   args.frontier, int(args.frontier_size),
+                   args.columnar, args.lean, args.mapped)
 
     if args.test:
         exit(0)
@@ -83,8 +107,8 @@ if __name__ == "__main__":
                                                                            str(args.min_confidence),
                                                                            timestamp), "wb"))
     else:
-        ns_dict = {v:k for k,v in g.namespaces()}
-        label_dict = generate_label_map(g)
+        ns_dict = {v:k for k,v in cache.namespaces()}
+        label_dict = generate_label_map(cache)
         with open("./generation_forest(d{}s{}c{})_{}.tsv".format(str(args.depth)[5:],
                                                                  str(args.min_support),
                                                                  str(args.min_confidence),
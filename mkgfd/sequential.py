@@ -1,51 +1,73 @@
 #! /usr/bin/env python
 
+from itertools import chain
 from random import random, choice
 from time import time
-from multiprocessing import Manager
 
-from rdflib.namespace import RDF, RDFS, XSD
+from rdflib.namespace import RDF, RDFS
 from rdflib.graph import Literal, URIRef
 
+from mkgfd.bitset import BitSet
 from mkgfd.structures import (Assertion, Clause, ClauseBody, TypeVariable,
                             DataTypeVariable, IdentityAssertion,
                             MultiModalNode,
                             MultiModalDateFragNode, MultiModalDateTimeNode,
                             MultiModalNumericNode, MultiModalStringNode,
-                            ObjectTypeVariable, GenerationForest, GenerationTree)
-from mkgfd.cache import Cache
-from mkgfd.metrics import support_of, confidence_of
+                            ObjectTypeVariable, GenerationForest, GenerationTree,
+                            ColumnarGenerationTree, FRONTIERS)
+from mkgfd.metrics import (ENGINES, NegativeMemo, SupportMemo,
+                           support_of_extension)
 from mkgfd.multimodal import (cluster, SUPPORTED_XSD_TYPES, XSD_DATEFRAG,
                         XSD_DATETIME, XSD_NUMERIC, XSD_STRING)
-from mkgfd.utils import cast_xsd, isEquivalent, predicate_frequency
+from mkgfd.utils import (decode_generation_forest, isEquivalent,
+                         predicate_frequency)
 
 
 IGNORE_PREDICATES = {RDF.type, RDFS.label}
 IDENTITY = URIRef("local://identity")  # reflexive property
 
-def generate(g, depths, min_support, min_confidence, p_explore, p_extend,
-             valprep, prune, mode, max_length_body, max_width, multimodal):
+def generate(cache, depths, min_support, min_confidence, p_explore, p_extend,
+             valprep, prune, mode, max_length_body, max_width, multimodal,
+             engine="python", memo_size=4096, share_memo=False,
+             incremental=False, frontier="bfs", frontier_size=0,
+             columnar=False, lean=False):
     """ Generate all clauses up to and including a maximum depth which satisfy a minimal
     support and confidence.
-    """
-    cache = Cache(g)
 
+    The engine, one of ENGINES, determines how support and confidence are
+    evaluated. Support of sub-patterns is memoized in a SupportMemo of at most
+    memo_size entries (none if 0), either per explored clause or, if
+    share_memo, per type and depth. If incremental, clauses keep the extents of
+    their body until their children are generated, and support is evaluated
+    from those instead. Bodies which lack support are kept per type and depth,
+    such that extensions which contain them are skipped. Clauses are explored
+    in the order of frontier, one of FRONTIERS, until it holds frontier_size
+    clauses, after which further ones are explored depth-first (unbounded if
+    0). If columnar, clauses are stored in ColumnarGenerationTrees. If lean,
+    clauses which won't be extended anymore, such as those of the last depth,
+    only keep a digest of their extents.
+    """
     t0 = time()
-    generation_forest = init_generation_forest(g, cache.object_type_map,
-                                               min_support, min_confidence,
-                                               mode, multimodal)
-
-    del g  # save memory
+    generation_forest = init_generation_forest(cache, min_support,
+                                               min_confidence, mode,
+                                               multimodal, columnar)
 
     mode_skip_dict = dict()
     npruned = 0
     for depth in range(0, depths.stop):
         print("generating depth {} / {}".format(depth+1, depths.stop))
         for ctype in generation_forest.types():
-            print(" type {}".format(ctype), end=" ")
+            print(" type {}".format(cache.decode(ctype)), end=" ")
             E = set()
             prune_set = set()
 
+            memo = None
+            nhits = nlookups = 0
+            if share_memo and memo_size > 0:
+                memo = SupportMemo(memo_size)
+
+            negatives = NegativeMemo()
+
             for phi in generation_forest.get_tree(ctype).get(depth):
                 #if depth == 0 and prune and\
                 #   (isinstance(clause.head.rhs, ObjectTypeVariable) or
@@ -95,6 +117,9 @@ def generate(g, depths, min_support, min_confidence, p_explore, p_extend,
 
                             C.add((a_i, a_j))
 
+                    if not share_memo and memo_size > 0:
+                        memo = SupportMemo(memo_size)
+
                     E |= explore(phi,
                                  C,
                                  depth,
@@ -107,11 +132,24 @@ def generate(g, depths, min_support, min_confidence, p_explore, p_extend,
                                  valprep,
                                  mode,
                                  max_length_body,
-                                 max_width)
+                                 max_width,
+                                 engine,
+                                 memo,
+                                 incremental,
+                                 negatives,
+                                 frontier,
+                                 frontier_size,
+                                 lean,
+                                 depth == depths.stop-1)
+
+                    if not share_memo and memo is not None:
+                        nhits += memo.hits
+                        nlookups += memo.hits + memo.misses
 
                 # clear domain of clause (which we won't need anymore) to save memory
                 phi._satisfy_body = None
                 phi._satisfy_full = None
+                phi._extents = None
 
                 if prune and depth > 0 and phi._prune is True:
                     prune_set.add(phi)
@@ -131,7 +169,23 @@ def generate(g, depths, min_support, min_confidence, p_explore, p_extend,
                     E -= prune_set
                     npruned += len(prune_set)
 
-            print("(+{} added)".format(len(E)))
+            if share_memo and memo is not None:
+                nhits = memo.hits
+                nlookups = memo.hits + memo.misses
+
+            if nlookups > 0:
+                print("(+{} added; memo: {} hits / {} lookups)".format(len(E),
+                                                                     nhits,
+                                                                     nlookups))
+            else:
+                print("(+{} added)".format(len(E)))
+
+            if depth == depths.stop-1:
+                # no children left to generate
+                for chi in E:
+                    chi._extents = None
+                    if lean:
+                        release(chi)
 
             # remove clauses after generating children if we are
             # not interested in previous depth
@@ -166,106 +220,160 @@ def generate(g, depths, min_support, min_confidence, p_explore, p_extend,
     else:
         print()
 
-    return generation_forest
+    return decode_generation_forest(generation_forest, cache)
 
 def visited(V, body, a_i, a_j):
-    body.extend(endpoint=a_i, extension=a_j)
-    return body in V
+    # hashes of different bodies may collide, so check the connections
+    for chi in V.get(body.hash_extended(endpoint=a_i, extension=a_j), ()):
+        if chi.body.is_extension_of(body, a_i, a_j):
+            return chi
+
+    return None
 
 def covers(body, a_i, a_j):
-    return a_j in body.connections[hash(a_i)]
+    # assertions are kept by their hash, so each can occur once per body
+    return hash(a_j) in body.connections.keys()
 
-def bad_combo(U, body, a_i, a_j):
-    body.extend(endpoint=a_i, extension=a_j)
-    return body in U
+def bad_combo(negatives, body, a_i, a_j):
+    return negatives is not None and negatives.covers(body, a_i, a_j)
+
+def exhausted(clause, depth, max_length_body, max_width):
+    return len(clause.body) == max_length_body or\
+            (depth+1 in clause.body.distances.keys() and
+             len(clause.body.distances[depth+1]) >= max_width)
+
+def release(clause):
+    """ Drop the extents of a clause which won't be extended anymore, and
+    keep a digest of them instead
+    """
+    if isinstance(clause._satisfy_body, BitSet):
+        clause._digest = (clause._satisfy_body.digest(),
+                          clause._satisfy_full.digest())
+
+    clause._satisfy_body = None
+    clause._satisfy_full = None
+    clause._extents = None
 
 def explore(phi, C,
             depth, cache, prune, min_support,
             min_confidence, p_explore,
             p_extend, valprep, mode,
-            max_length_body, max_width):
+            max_length_body, max_width, engine="python", memo=None,
+            incremental=False, negatives=None, frontier="bfs",
+            frontier_size=0, lean=False, final=False):
     """ Explore all predicate-object pairs which where added by the previous
     iteration as possible endpoints to expand from.
+
+    Clauses yet to be explored are kept in a frontier, one of FRONTIERS, of
+    frontier_size clauses (unbounded if 0), beyond which they are explored
+    depth-first.
+
+    If a SupportMemo is given, it is shared by all extensions. If a
+    NegativeMemo is given, extensions into bodies which contain one that lacks
+    support are skipped, and those which lack support are added to it.
+
+    If lean, extended clauses are released as soon as they won't be extended
+    anymore: once they reach the maximum length, or, if final (ie, they won't
+    be explored at a next depth), once explored or of maximum width.
     """
     E = set()  # extended clauses
-    V = set()  # visited clauses
-    U = set()  # bad combinations
+    V = dict()  # visited clauses by hash of their body, as lists
+    P = dict()  # parents of extended clauses
 
-    with Manager() as manager:
-        qexplore = manager.Queue()
-        qexplore.put(phi)
-        while not qexplore.empty():
-            psi = qexplore.get()
+    # try candidates in order of creation rather than that of the set, as
+    # equivalent extensions are omitted in favour of the first one added
+    C = sorted(C, key=lambda c: (c[0]._index, c[1]._index))
 
-            if len(psi.body) == max_length_body:
-                continue
+    frontier = FRONTIERS[frontier](frontier_size)
+    frontier.put(phi)
+    while not frontier.empty():
+        psi = frontier.get()
 
-            if depth+1 in psi.body.distances.keys():
-                if len(psi.body.distances[depth+1]) >= max_width:
-                    continue
+        if exhausted(psi, depth, max_length_body, max_width):
+            continue
 
-            # skip with probability of (1 - p_explore)
-            skip_endpoint = None
-            if p_explore < random():
-                skip_endpoint = choice(tuple(C))
+        # skip with probability of (1 - p_explore)
+        skip_endpoint = None
+        if p_explore < random():
+            skip_endpoint = choice(tuple(C))
 
-            for a_i, a_j in C:
-                # test identity here as endpoint is same object
-                if a_j is skip_endpoint:
-                    continue
+        for a_i, a_j in C:
+            # test identity here as endpoint is same object
+            if a_j is skip_endpoint:
+                continue
 
-                # skip with probability of (1 - p_extend)
-                # place it here as we only want to skip those we are really adding
-                if p_extend < random():
-                    continue
+            # skip with probability of (1 - p_extend)
+            # place it here as we only want to skip those we are really adding
+            if p_extend < random():
+                continue
 
-                if visited(V, psi.body.copy(), a_i, a_j)\
-                   or covers(psi.body, a_i, a_j)\
-                   or bad_combo(U, psi.body.copy(), a_i, a_j):
-                    continue
+            chi = visited(V, psi.body, a_i, a_j)
+            if chi is not None:
+                # reached before in another order
+                P[chi].append(psi)
+                if valprep:
+                    psi.children.add(chi)
 
-                chi = extend(psi, a_i, a_j, cache, depth,
-                             min_support, min_confidence)
-
-                if chi is not None:
-                    qexplore.put(chi)
-                    E.add(chi)
-                    V.add(chi.body.copy())
-
-                    # add link for validation optimization
-                    if valprep:
-                        psi.children.add(chi)
-                else:
-                    U.add((psi.body.copy(), a_i, a_j))
-
-        if len(E) <= 0 or not prune:
-            return E
-
-        # set delayed pruning on siblings if all have same support/confidence
-        # (ie, as it doesn't matter which extension we add, we can assume that none really matter)
-        qprune = manager.Queue()
-        qprune.put(phi)
-        while not qprune.empty():
-            psi = qprune.get()
-            scores_set = list()
-            for chi in psi.children:
-                scores_set.append((chi.support, chi.confidence))
-
-                if len(chi.children) > 0:
-                    qprune.put(chi)
-
-            if len(psi.children) >= 2\
-               and scores_set.count(scores_set)[0] == len(scores_set):
-                for chi in psi.children:
-                    chi._prune = True
+                continue
+
+            if covers(psi.body, a_i, a_j)\
+               or bad_combo(negatives, psi.body, a_i, a_j):
+                continue
+
+            chi = extend(psi, a_i, a_j, cache, depth,
+                         min_support, min_confidence, engine, memo,
+                         incremental, negatives)
+
+            if chi is not None:
+                frontier.put(chi)
+                E.add(chi)
+                if hash(chi.body) not in V.keys():
+                    V[hash(chi.body)] = list()
+                V[hash(chi.body)].append(chi)
+                P[chi] = [psi]
+
+                # add link for validation optimization
+                if valprep:
+                    psi.children.add(chi)
+
+                if lean and (len(chi.body) == max_length_body or final and
+                             exhausted(chi, depth, max_length_body, max_width)):
+                    release(chi)
+
+        if lean and final and psi is not phi:
+            # explored all its extensions
+            release(psi)
+
+    if len(E) <= 0:
+        return E
+
+    # set delayed pruning on siblings if all have same support/confidence
+    # (ie, as it doesn't matter which extension we add, we can assume that none really matter)
+    uniform = set()
+    if prune:
+        for psi in chain([phi], E):
+            scores_set = {(chi.support, chi.confidence) for chi in psi.children}
+            if len(psi.children) >= 2 and len(scores_set) == 1:
+                uniform.add(psi)
+
+    # set delayed pruning if no reduction in domain; decided once all parents
+    # are known, such that it doesn't depend on which reached a clause first
+    for chi in E:
+        chi._prune = all(chi.support >= psi.support or psi in uniform
+                         for psi in P[chi])
 
     return E
 
 def extend(psi, a_i, a_j, cache,
-           depth, min_support, min_confidence):
+           depth, min_support, min_confidence, engine="python", memo=None,
+           incremental=False, negatives=None):
     """ Extend a clause from a given endpoint variable by evaluating all
     possible candidate extensions on whether they satisfy the minimal support
     and confidence.
+
+    If incremental, support is evaluated from the extents of the parent, which
+    are then kept by the extended clause as well. Extensions which lack
+    support are added to negatives, if given.
     """
 
     # omit if candidate for level 0 is equivalent to head
@@ -288,22 +396,37 @@ def extend(psi, a_i, a_j, cache,
     body = psi.body.copy()
     body.extend(endpoint=a_i, extension=a_j)
 
+    support_of, confidence_of = ENGINES[engine]
+
     # compute support
-    support, satisfies_body = support_of(cache.predicate_map,
-                                         cache.object_type_map,
-                                         cache.data_type_map,
-                                         body,
-                                         body.identity,
-                                         psi._satisfy_body,
-                                         min_support)
+    extents = None
+    if incremental and psi._extents is None and len(psi.body) <= 1:
+        # the body of a root consists of just the identity
+        psi._extents = {hash(psi.body.identity): (psi._satisfy_body,
+                                                  psi._satisfy_body)}
+    if incremental and psi._extents is not None:
+        support, satisfies_body, extents = support_of_extension(cache,
+                                                                body,
+                                                                a_i,
+                                                                a_j,
+                                                                psi._extents,
+                                                                min_support)
+    else:
+        support, satisfies_body = support_of(cache,
+                                             body,
+                                             body.identity,
+                                             psi._satisfy_body,
+                                             min_support,
+                                             memo)
 
     if support < min_support:
+        if negatives is not None:
+            negatives.add(psi.body, a_i, a_j)
+
         return None
 
     # compute confidence
-    confidence, satisfies_full = confidence_of(cache.predicate_map,
-                                               cache.object_type_map,
-                                               cache.data_type_map,
+    confidence, satisfies_full = confidence_of(cache,
                                                head,
                                                satisfies_body)
     if confidence < min_confidence:
@@ -313,31 +436,29 @@ def extend(psi, a_i, a_j, cache,
     chi = Clause(head=head,
                  body=body,
                  parent=psi)
-    chi._satisfy_body = satisfies_body
-    chi._satisfy_full = satisfies_full
+    chi._satisfy_body = satisfies_body.intern()
+    chi._satisfy_full = satisfies_full.intern()
+    chi._extents = extents
 
     chi.support = support
     chi.confidence = confidence
     chi.domain_probability = confidence / support
 
-    pfreq = predicate_frequency(cache.predicate_map,
+    pfreq = predicate_frequency(cache,
                                 head,
                                 satisfies_body)
     chi.range_probability = confidence / pfreq
 
-    # set delayed pruning if no reduction in domain
-    if support >= psi.support:
-        chi._prune = True
-
     return chi
 
-def init_generation_forest(g, class_instance_map, min_support, min_confidence,
-                           mode, multimodal):
+def init_generation_forest(cache, min_support, min_confidence, mode,
+                           multimodal, columnar=False):
     """ Initialize the generation forest by creating all generation trees of
     types which satisfy minimal support and confidence.
     """
     print("initializing Generation Forest")
     generation_forest = GenerationForest()
+    class_instance_map = cache.object_type_map
 
     # don't generate what we won't need
     generate_Abox_heads = True
@@ -354,16 +475,18 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
         if support < min_support:
             continue
 
-        print(" initializing Generation Tree for type {}...".format(str(t)), end=" ")
+        print(" initializing Generation Tree for type {}...".format(str(cache.decode(t))), end=" ")
+        class_instances = cache.instance_set(t)
+
         # gather all predicate-object pairs belonging to the members of a type
-        predicate_object_map = map_predicate_object_pairs(g, class_instance_map['type-to-object'][t])
+        predicate_object_map = map_predicate_object_pairs(cache, class_instances)
 
         # create shared variables
         parent = Clause(head=True, body={})
         var = ObjectTypeVariable(type=t)
 
         # generate clauses for each predicate-object pair
-        generation_tree = GenerationTree()
+        generation_tree = ColumnarGenerationTree() if columnar else GenerationTree()
         for p in predicate_object_map.keys():
             pfreq = sum(predicate_object_map[p].values())
             if pfreq < min_support:
@@ -379,14 +502,11 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
             for o in predicate_object_map[p].keys():
                 if generate_Tbox_heads:
                     # map resources to types for unbound type generation
-                    map_resources(g, p, o, class_instance_map['type-to-object'][t],
+                    map_resources(cache, p, o, class_instances,
                                   object_types_map, data_types_map)
 
-                if multimodal and type(o) is Literal:
-                    dtype = o.datatype
-                    if dtype is None:
-                        dtype = XSD.string if o.language != None else XSD.anyType
-
+                if multimodal and type(cache.decode(o)) is Literal:
+                    dtype = cache.data_type_map['object-to-type'][o]
                     if dtype not in SUPPORTED_XSD_TYPES:
                         # skip if not supported
                         continue
@@ -405,8 +525,8 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
                 #    continue
 
                 # create new clause
-                phi = new_clause(g, parent, var, p, o,
-                                 class_instance_map['type-to-object'][t],
+                phi = new_clause(cache, parent, var, p, o,
+                                 class_instances,
                                  pfreq, min_confidence)
                 if phi is not None:
                     generation_tree.add(phi, depth=0)
@@ -420,7 +540,7 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
 
                     var_o = ObjectTypeVariable(type=ctype)
                     phi = new_variable_clause(parent, var, p, var_o,
-                                              class_instance_map['type-to-object'][t],
+                                              class_instances,
                                               object_types_map[ctype], pfreq, min_confidence)
 
                     if phi is not None:
@@ -433,7 +553,7 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
 
                     var_o = DataTypeVariable(type=dtype)
                     phi = new_variable_clause(parent, var, p, var_o,
-                                              class_instance_map['type-to-object'][t],
+                                              class_instances,
                                               data_types_map[dtype], pfreq, min_confidence)
 
                     if phi is not None:
@@ -449,7 +569,8 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
                         continue
 
                     # determine clusters per xsd type
-                    values_sets = cluster(data_types_values_map[dtype],
+                    values_sets = cluster([cache.decode(o) for o in
+                                           data_types_values_map[dtype]],
                                           dtype)
                     nsets = len(values_sets)
                     if nsets <= 0 or nvalues/nsets < min_confidence:
@@ -473,9 +594,9 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
                                                            value_set))
 
                     for node in nodes:
-                        phi = new_multimodal_clause(g, parent, var, p, node, dtype,
+                        phi = new_multimodal_clause(cache, parent, var, p, node, dtype,
                                                     data_types_values_map,
-                                                    class_instance_map['type-to-object'][t],
+                                                    class_instances,
                                                     pfreq, min_confidence)
 
                         if phi is not None:
@@ -490,18 +611,20 @@ def init_generation_forest(g, class_instance_map, min_support, min_confidence,
 
     return generation_forest
 
-def new_clause(g, parent, var, p, o, class_instance_map, pfreq, min_confidence):
+def new_clause(cache, parent, var, p, o, class_instance_map, pfreq, min_confidence):
     phi = Clause(head=Assertion(var, p, o),
                  body=ClauseBody(identity=IdentityAssertion(var, IDENTITY, var)),
                  parent=parent)
 
-    phi._satisfy_full = {e for e in class_instance_map if (e, p, o) in g}
+    # entities of this type for which (e, p, o) holds
+    phi._satisfy_full = (class_instance_map &\
+            BitSet(cache.predicate_map[p]['backwards'][o])).intern()
     phi.confidence = len(phi._satisfy_full)
 
     if phi.confidence < min_confidence:
         return None
 
-    phi._satisfy_body = {e for e in class_instance_map}
+    phi._satisfy_body = class_instance_map
     phi.support = len(phi._satisfy_body)
 
     phi.domain_probability = phi.confidence/phi.support
@@ -514,12 +637,12 @@ def new_variable_clause(parent, var, p, o, class_instance_map, types_map, pfreq,
                  body=ClauseBody(identity=IdentityAssertion(var, IDENTITY, var)),
                  parent=parent)
 
-    phi._satisfy_full = {e for e in types_map}
+    phi._satisfy_full = BitSet(types_map).intern()
     phi.confidence = len(phi._satisfy_full)
     if phi.confidence < min_confidence:
         return None
 
-    phi._satisfy_body = {e for e in class_instance_map}
+    phi._satisfy_body = class_instance_map
     phi.support = len(phi._satisfy_body)
 
     phi.domain_probability = phi.confidence/phi.support
@@ -527,25 +650,23 @@ def new_variable_clause(parent, var, p, o, class_instance_map, types_map, pfreq,
 
     return phi
 
-def new_multimodal_clause(g, parent, var, p, node, dtype, data_types_values_map,
+def new_multimodal_clause(cache, parent, var, p, node, dtype, data_types_values_map,
                           class_instance_map, pfreq, min_confidence):
     phi = Clause(head=Assertion(var, p, node),
                  body=ClauseBody(identity=IdentityAssertion(var, IDENTITY, var)),
                  parent=parent)
 
-    phi._satisfy_full = set()
-    for e in class_instance_map:
-        for o in g.objects(e, p):
-            if type(o) is Literal and\
-               o in data_types_values_map[dtype] and\
-               cast_xsd(o, dtype) in node:
-                phi._satisfy_full.add(e)
-
+    # literals of this type's members are a subset of the objects of p
+    _, resources = cache.data_type_sets(p, dtype)
+    backwards = cache.predicate_map[p]['backwards']
+    phi._satisfy_full = (class_instance_map &\
+            BitSet(chain.from_iterable(backwards[o] for o in
+                                       resources & cache.literal_set(node)))).intern()
     phi.confidence = len(phi._satisfy_full)
     if phi.confidence < min_confidence:
         return None
 
-    phi._satisfy_body = {e for e in class_instance_map}
+    phi._satisfy_body = class_instance_map
 
     phi.support = len(phi._satisfy_body)
     phi.domain_probability = phi.confidence/phi.support
@@ -554,20 +675,18 @@ def new_multimodal_clause(g, parent, var, p, node, dtype, data_types_values_map,
     return phi
 
 # map rhs (data)type to lhs entities
-def map_resources(g, p, o, class_instance_map,
+def map_resources(cache, p, o, class_instance_map,
                   object_types_map, data_types_map):
     types = list()
-    if type(o) is URIRef:
-        types = list(g.objects(o, RDF.type))
+    term = cache.decode(o)
+    if type(term) is URIRef:
+        types = list(cache.object_type_map['object-to-type'][o])
         if len(types) <= 0:
-            types.append(RDFS.Class)
+            types.append(cache.lookup(RDFS.Class))
 
         types_map = object_types_map
-    elif type(o) is Literal:
-        t = o.datatype
-        if t is None:
-            t = XSD.string if o.language != None else XSD.anyType
-        types.append(t)
+    elif type(term) is Literal:
+        types.append(cache.data_type_map['object-to-type'][o])
 
         types_map = data_types_map
     else:
@@ -576,21 +695,26 @@ def map_resources(g, p, o, class_instance_map,
     for t in types:
         if t not in types_map.keys():
             types_map[t] = set()
-        types_map[t].update({e for e in class_instance_map if (e, p, o) in g})
+        types_map[t].update(class_instance_map &
+                            BitSet(cache.predicate_map[p]['backwards'][o]))
 
 # map and count every (p ,o)-pair belonging to entities of this type
-def map_predicate_object_pairs(g, class_instance_map):
+def map_predicate_object_pairs(cache, class_instance_map):
+    ignore = {cache.lookup(p) for p in IGNORE_PREDICATES}
+
     predicate_object_map = dict()
-    for e in class_instance_map:
-        for _, p, o in g.triples((e, None, None)):
-            if p in IGNORE_PREDICATES:
-                continue
+    for p in cache.predicate_map.keys():
+        if p in ignore:
+            continue
 
-            if p not in predicate_object_map.keys():
-                predicate_object_map[p] = dict()
-            if o not in predicate_object_map[p].keys():
-                predicate_object_map[p][o] = 0
+        forwards = cache.predicate_map[p]['forwards']
+        for e in cache.subject_set(p) & class_instance_map:
+            for o in forwards[e]:
+                if p not in predicate_object_map.keys():
+                    predicate_object_map[p] = dict()
+                if o not in predicate_object_map[p].keys():
+                    predicate_object_map[p][o] = 0
 
-            predicate_object_map[p][o] = predicate_object_map[p][o] + 1
+                predicate_object_map[p][o] = predicate_object_map[p][o] + 1
 
     return predicate_object_map
@@ -0,0 +1,184 @@
+#! /usr/bin/env python
+
+from hashlib import blake2b
+from itertools import chain
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import numpy as np
+from rdflib.term import BNode, Literal, URIRef
+
+from mkgfd.cache import Cache
+
+
+# increment on every change to the layout
+SNAPSHOT_VERSION = 1
+
+_URIREF = 0
+_BNODE = 1
+_LITERAL = 2
+
+_READ_BLOCKSIZE = 2**20
+_TRIPLE_BLOCKSIZE = 2**20
+
+def fingerprint(paths, deltas=()):
+    """ Return a hash of the content of one or more files, in order
+
+    The hash also covers the snapshot version, such that snapshots in an
+    older layout are never reused.
+    """
+    return fingerprints(paths, deltas)[-1]
+
+def fingerprints(paths, deltas=()):
+    """ Return the hashes of the input files followed by each delta
+
+    The first hash covers only the input files, and each following hash one
+    more delta, such that a snapshot with part of the deltas applied can be
+    found and updated with the remaining ones.
+    """
+    h = blake2b(digest_size=16)
+    h.update(b"mkgfd-snapshot-%d" % SNAPSHOT_VERSION)
+    for path in paths:
+        _hash_file(h, path)
+
+    digests = [h.hexdigest()]
+    for path in deltas:
+        h.update(b"delta")
+        _hash_file(h, path)
+
+        digests.append(h.hexdigest())
+
+    return digests
+
+def _hash_file(h, path):
+    # separate the files to avoid ambiguous concatenations
+    h.update(b"%d" % os.path.getsize(path))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_BLOCKSIZE), b''):
+            h.update(chunk)
+
+def save_snapshot(cache, path):
+    """ Write an encoded Cache to a snapshot directory
+
+    The snapshot consists of several NumPy arrays: the triples as rows of
+    IDs, and the dictionary as a single UTF-8 blob of lexical forms with
+    offsets, term kinds, and data types or language tags. All other maps,
+    including the per-type instance sets, are derived from these on load.
+    """
+    if cache.dictionary is None:
+        raise ValueError("Only encoded caches can be stored as snapshot")
+
+    num_terms = len(cache.dictionary)
+    kinds = np.empty(num_terms, dtype=np.uint8)
+    offsets = np.empty(num_terms + 1, dtype=np.int64)
+    term_annotations = np.full(num_terms, -1, dtype=np.int32)
+    annotations = dict()  # datatype or language tag -> index
+
+    lexicals = list()
+    offset = 0
+    for i, term in enumerate(cache.dictionary):
+        lexical = str(term)
+        lexicals.append(lexical)
+
+        # offsets are in characters, not in bytes
+        offsets[i] = offset
+        offset += len(lexical)
+
+        if isinstance(term, Literal):
+            kinds[i] = _LITERAL
+
+            annotation = None
+            if term.datatype is not None:
+                annotation = "^^" + str(term.datatype)
+            elif term.language is not None:
+                annotation = "@" + term.language
+
+            if annotation is not None:
+                term_annotations[i] = annotations.setdefault(annotation,
+                                                             len(annotations))
+        elif isinstance(term, BNode):
+            kinds[i] = _BNODE
+        else:
+            kinds[i] = _URIREF
+    offsets[-1] = offset
+
+    text = "".join(lexicals).encode('utf-8', 'surrogatepass')
+    del lexicals
+
+    dtype = np.int32 if num_terms < 2**31 else np.int64
+    num_triples = sum(len(resources) for maps in cache.predicate_map.values()
+                      for resources in maps['forwards'].values())
+    triples = np.fromiter(chain.from_iterable((s, p, o)
+                          for p, maps in cache.predicate_map.items()
+                          for s, resources in maps['forwards'].items()
+                          for o in resources),
+                          dtype=dtype,
+                          count=3*num_triples).reshape((num_triples, 3))
+
+    namespaces = np.array([[prefix, str(namespace)] for prefix, namespace in
+                           cache.namespaces()], dtype=str).reshape((-1, 2))
+
+    # write to a temporary directory first to never leave a partial snapshot
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmpdir = mkdtemp(prefix=".snapshot-", dir=parent)
+    try:
+        for name, array in [("triples", triples),
+                            ("kinds", kinds),
+                            ("offsets", offsets),
+                            ("lexicals", np.frombuffer(text, dtype=np.uint8)),
+                            ("term_annotations", term_annotations),
+                            ("annotations", np.array(list(annotations.keys()),
+                                                     dtype=str)),
+                            ("namespaces", namespaces)]:
+            np.save(os.path.join(tmpdir, name + ".npy"), array)
+
+        os.rename(tmpdir, path)
+    except OSError:
+        # another process may have been faster
+        rmtree(tmpdir, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+def load_snapshot(path):
+    """ Read a Cache from a snapshot directory """
+    def load(name, mmap_mode='r'):
+        return np.load(os.path.join(path, name + ".npy"),
+                       mmap_mode=mmap_mode)
+
+    annotations = list()
+    for annotation in load("annotations", mmap_mode=None).tolist():
+        if annotation.startswith("^^"):
+            annotations.append((URIRef(annotation[2:]), None))
+        else:
+            annotations.append((None, annotation[1:]))
+
+    text = load("lexicals").tobytes().decode('utf-8', 'surrogatepass')
+    offsets = load("offsets").tolist()
+
+    cache = Cache()
+    for i, (kind, annotation) in enumerate(zip(load("kinds").tolist(),
+                                               load("term_annotations").tolist())):
+        lexical = text[offsets[i]:offsets[i+1]]
+        if kind == _LITERAL:
+            datatype, language = annotations[annotation]\
+                    if annotation >= 0 else (None, None)
+            term = Literal(lexical, lang=language, datatype=datatype)
+        elif kind == _BNODE:
+            term = BNode(lexical)
+        else:
+            term = URIRef(lexical)
+
+        if cache.encode(term) != i:
+            raise ValueError("Inconsistent dictionary in snapshot " + path)
+    del text, offsets
+
+    triples = load("triples")
+    for i in range(0, triples.shape[0], _TRIPLE_BLOCKSIZE):
+        cache.extend(triples[i:i+_TRIPLE_BLOCKSIZE])
+
+    for prefix, namespace in load("namespaces", mmap_mode=None).tolist():
+        cache.bind(prefix, URIRef(namespace))
+
+    return cache
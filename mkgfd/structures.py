@@ -1,8 +1,13 @@
 #! /usr/bin/env python
 
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from os import getpid, register_at_fork
 from re import fullmatch
-from uuid import uuid4
+from sys import hash_info
 
+import numpy as np
 from rdflib.term import Node
 
 from mkgfd.timeutils import days_to_date
@@ -31,6 +36,9 @@ class Clause():
     _prune = False
     _satisfy_body = None
     _satisfy_full = None
+    _extents = None  # (range, domain) per assertion of the body, if kept
+    _row = None  # (columns ID, row) if stored in a ColumnarGenerationTree
+    _digest = None  # digests of (satisfy_body, satisfy_full) once released
 
     def __init__(self, head, body, domain_probability=0.0,
                  range_probability=0.0, confidence=0, support=0, parent=None):
@@ -45,6 +53,7 @@ class Clause():
         self._prune = False
         self._satisfy_body = set()
         self._satisfy_full = set()
+        self._extents = None
 
     def __len__(self):
         return len(self.body)
@@ -74,23 +83,45 @@ class TypeVariable(Node):
     """ Type Variable class
 
     An unbound variable which can take on any value of a certain object or
-    data type resource
+    data type resource. Variables which are defined by their type alone are
+    interned, such that each exists only once per process.
     """
-    type = None
+    __slots__ = ['type', '_hash']
+
+    def __new__(cls, type, *args):
+        if issubclass(cls, MultiModalNode):
+            return super().__new__(cls)
+
+        key = (cls, type)
+        if key not in _type_variables.keys():
+            _type_variables[key] = super().__new__(cls)
+
+        return _type_variables[key]
 
     def __init__(self, type):
         self.type = type
+        self._hash = self._compute_hash()
         super().__init__()
 
     def __eq__(self, other):
         return type(self) is type(other)\
-                and self.type is other.type
+                and self.type == other.type
 
     def __lt__(self, other):
         return self.type < other.type
 
     def __hash__(self):
-        return hash(str(self.__class__.__name__)+str(self.type))
+        return self._hash
+
+    def _compute_hash(self):
+        return hash((self.__class__.__name__, self.type))
+
+    def __reduce__(self):
+        # reconstruct, such that unpickled variables are interned as well
+        return (self.__class__, self._args())
+
+    def _args(self):
+        return (self.type,)
 
     def __str__(self):
         return "TYPE [{}]".format(str(self.type))
@@ -99,6 +130,8 @@ class TypeVariable(Node):
         return "TypeVariable {} [{}]".format(str(id(self)),
                                              str(self))
 
+_type_variables = dict()  # interned type variables by class and type
+
 
 class ObjectTypeVariable(TypeVariable):
     """ Object Type Variable class
@@ -106,6 +139,8 @@ class ObjectTypeVariable(TypeVariable):
     An unbound variable which can be any member of an object type class
     (entity)
     """
+    __slots__ = []
+
     def __init__(self, type):
         super().__init__(type)
 
@@ -123,6 +158,8 @@ class DataTypeVariable(TypeVariable):
     An unbound variable which can take on any value of a data type class
     (literal)
     """
+    __slots__ = []
+
     def __init__(self, type):
         super().__init__(type)
 
@@ -134,6 +171,8 @@ class DataTypeVariable(TypeVariable):
 
 class MultiModalNode(TypeVariable):
     """ Multimodal Node class """
+    __slots__ = []
+
     def __init__(self, type):
         super().__init__(type)
 
@@ -146,17 +185,16 @@ class MultiModalNode(TypeVariable):
 
 class MultiModalNumericNode(MultiModalNode):
     """ Numeric Node class """
-    min = 0.0
-    max = 0.0
+    __slots__ = ['min', 'max']
 
     def __init__(self, type, min, max):
-        super().__init__(type)
         self.min = min
         self.max = max
+        super().__init__(type)
 
     def __eq__(self, other):
         return type(self) is type(other)\
-                and self.type is other.type\
+                and self.type == other.type\
                 and self.min == other.min\
                 and self.max == other.max
 
@@ -167,9 +205,18 @@ class MultiModalNumericNode(MultiModalNode):
     def __contains__(self, value):
         return value >= self.min and value <= self.max
 
+    def mask(self, values):
+        """ Vectorized __contains__ over an array of cast values """
+        return (values >= self.min) & (values <= self.max)
+
     def __hash__(self):
-        return hash(str(self.__class__.__name__)+str(self.type)
-                    +str(self.min)+str(self.max))
+        return self._hash
+
+    def _compute_hash(self):
+        return hash((self.__class__.__name__, self.type, self.min, self.max))
+
+    def _args(self):
+        return (self.type, self.min, self.max)
 
     def __str__(self):
         return "Numeric ({},{})".format(str(self.min),
@@ -181,16 +228,16 @@ class MultiModalNumericNode(MultiModalNode):
 
 class MultiModalStringNode(MultiModalNode):
     """ String Node class """
-    regex = ""
+    __slots__ = ['regex']
 
     def __init__(self, type, regex):
-        super().__init__(type)
         self.regex = regex
+        super().__init__(type)
 
     def __eq__(self, other):
         # does not account for equivalent regex patterns
         return type(self) is type(other)\
-                and self.type is other.type\
+                and self.type == other.type\
                 and self.regex == other.regex
 
     def __lt__(self, other):
@@ -201,9 +248,20 @@ class MultiModalStringNode(MultiModalNode):
     def __contains__(self, value):
         return fullmatch(self.regex, value) is not None
 
+    def mask(self, values):
+        """ Vectorized __contains__ over an array of cast values """
+        return np.fromiter((isinstance(value, str) and value in self
+                            for value in values),
+                           dtype=bool, count=len(values))
+
     def __hash__(self):
-        return hash(str(self.__class__.__name__)+str(self.type)
-                    +self.regex)
+        return self._hash
+
+    def _compute_hash(self):
+        return hash((self.__class__.__name__, self.type, self.regex))
+
+    def _args(self):
+        return (self.type, self.regex)
 
     def __str__(self):
         return "String ({})".format(self.regex)
@@ -214,17 +272,16 @@ class MultiModalStringNode(MultiModalNode):
 
 class MultiModalDateTimeNode(MultiModalNode):
     """ Date Time Node class """
-    begin = 0.0
-    end = 0.0
+    __slots__ = ['begin', 'end']
 
     def __init__(self, type, begin, end):
-        super().__init__(type)
         self.begin = begin
         self.end = end
+        super().__init__(type)
 
     def __eq__(self, other):
         return type(self) is type(other)\
-                and self.type is other.type\
+                and self.type == other.type\
                 and self.begin == other.begin\
                 and self.end == other.end
 
@@ -235,9 +292,22 @@ class MultiModalDateTimeNode(MultiModalNode):
     def __contains__(self, value):
         return value >= self.begin and value <= self.end
 
+    def mask(self, values):
+        """ Vectorized __contains__ over an array of cast values """
+        begin = np.datetime64(self.begin.replace(tzinfo=None), 'us')
+        end = np.datetime64(self.end.replace(tzinfo=None), 'us')
+
+        return (values >= begin) & (values <= end)
+
     def __hash__(self):
-        return hash(str(self.__class__.__name__)+str(self.type)
-                    +str(self.begin)+str(self.end))
+        return self._hash
+
+    def _compute_hash(self):
+        return hash((self.__class__.__name__, self.type, self.begin,
+                     self.end))
+
+    def _args(self):
+        return (self.type, self.begin, self.end)
 
     def __str__(self):
         return "DateTime ({},{})".format(str(self.begin),
@@ -249,8 +319,7 @@ class MultiModalDateTimeNode(MultiModalNode):
 
 class MultiModalDateFragNode(MultiModalDateTimeNode):
     """ Date Fragment Node class """
-    gBegin = 0
-    gEnd = 0
+    __slots__ = ['gBegin', 'gEnd']
 
     def __init__(self, type, begin, end):
         # begin and end are in number of days
@@ -258,6 +327,10 @@ class MultiModalDateFragNode(MultiModalDateTimeNode):
         self.gBegin = days_to_date(begin, type)
         self.gEnd = days_to_date(end, type)
 
+    def mask(self, values):
+        """ Vectorized __contains__ over an array of cast values """
+        return (values >= self.begin) & (values <= self.end)
+
     def __str__(self):
         return "DateFrag ({},{})".format(str(self.gBegin),
                                          str(self.gEnd))
@@ -266,59 +339,61 @@ class MultiModalDateFragNode(MultiModalDateTimeNode):
         return "MultiModalNode {} {}".format(str(id(self)),
                                              str(self))
 
-class Assertion(tuple):
+class Assertion():
     """ Assertion class
 
-    Wrapper around tuple (an assertion) that gives each instantiation an
-    unique uuid which allows for comparisons between assertions with the
-    same values. This is needed when either lhs or rhs use TypeVariables.
+    An assertion (subject, predicate, object) that gets an unique index on
+    instantiation, which allows for comparisons between assertions with the
+    same values. This is needed when either lhs or rhs use TypeVariables. The
+    hash is a mix of the index, such that the hashes of bodies, which combine
+    those of their assertions, are spread evenly.
     """
-    lhs = None
-    predicate = None
-    rhs = None
-    _uuid = None
-    _hash = None
-    _str = None
-
-    def __new__(cls, subject, predicate, object):
-        return super().__new__(cls, (subject, predicate, object))
+    __slots__ = ['lhs', 'predicate', 'rhs', '_index', '_hash', '_str']
 
-    def __init__(self, subject, predicate, object, _uuid=None):
+    def __init__(self, subject, predicate, object, _index=None):
         self.lhs = subject
         self.predicate = predicate
         self.rhs = object
 
-        self._str = self._compute_str()
-        self._uuid = _uuid if _uuid is not None else uuid4()
-        self._hash = self._gen_hash()
+        self._str = None  # rendered when needed
+        self._index = _index if _index is not None else next(_indices)
+        self._hash = hash(_mix(self._index))
 
-    def copy(self, reset_uuid=True):
-        copy = Assertion(self.lhs, self.predicate, self.rhs)
-        if not reset_uuid:
-            copy._uuid = self._uuid
-            copy._hash = copy._gen_hash()
+    def copy(self, reset_index=True):
+        return type(self)(self.lhs, self.predicate, self.rhs,
+                          None if reset_index else self._index)
 
-        return copy
+    def __getstate__(self):
+        return (self.lhs, self.predicate, self.rhs, self._index)
 
-    def __getnewargs__(self):
-        return (self.lhs, self.predicate, self.rhs)
+    def __setstate__(self, state):
+        self.lhs, self.predicate, self.rhs, self._index = state
+        self._str = None
+        self._hash = hash(_mix(self._index))
+
+    def __iter__(self):
+        return iter((self.lhs, self.predicate, self.rhs))
+
+    def __len__(self):
+        return 3
 
     def __hash__(self):
         return self._hash
 
-    def _gen_hash(self):
-        # require unique hash to prevent overlapping dict keys
-        return hash("".join([str(self.lhs), str(self.predicate),
-                             str(self.rhs), str(self._uuid)]))
-
     def _compute_str(self):
         return "(" + ', '.join([str(self.lhs),
                                 str(self.predicate),
                                 str(self.rhs)]) + ")"
 
     def __str__(self):
+        if self._str is None:
+            self._str = self._compute_str()
+
         return self._str
 
+    def __repr__(self):
+        return "{} {}".format(self.__class__.__name__, str(self))
+
     def __lt__(self, other):
         for a, b in [(self.lhs, other.lhs),
                      (self.predicate, other.predicate),
@@ -339,84 +414,204 @@ class IdentityAssertion(Assertion):
     Special class for identity assertion to allow for each recognition and
     selection.
     """
-    def __new__(cls, subject, predicate, object):
-        return super().__new__(cls, subject, predicate, object)
+    __slots__ = []
+
+def _reset_indices():
+    global _indices
+    # indices are unique across processes, as assertions are passed between them
+    _indices = count(getpid() << 32)
+
+_indices = None
+_reset_indices()
+register_at_fork(after_in_child=_reset_indices)
+
+_HASH_MASK = (1 << 64) - 1
+
+def _mix(index):
+    # splitmix64 finalizer: consecutive indices map onto unrelated values
+    z = (index + 0x9e3779b97f4a7c15) & _HASH_MASK
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & _HASH_MASK
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & _HASH_MASK
 
-    def copy(self, reset_uuid=True):
-        copy = IdentityAssertion(self.lhs, self.predicate, self.rhs)
-        if not reset_uuid:
-            copy._uuid = self._uuid
-            copy._hash = copy._gen_hash()
+    return z ^ (z >> 31)
+
+# body hashes stay below the largest hash, such that hash() of a body returns
+# them as is, rather than reduced, and matches those of hash_extended()
+_BODY_HASH_MASK = (1 << (hash_info.width - 1)) - 1
+
+def _connection_hash(endpoint, extension):
+    # hash of a single connection; body hashes sum these, such that the
+    # order of connections does not matter
+    return hash((hash(endpoint), hash(extension)))
+
+class _BodyNode():
+    """ Body Node class
+
+    Immutable link in a chain of extensions, starting from the identity. Nodes
+    are shared by all bodies that extend them, and the mappings of a body are
+    derived from its chain the first time they are needed.
+    """
+    __slots__ = ['parent', 'endpoint', 'extension', 'distance', 'length',
+                 'hash', 'views', 'str']
+
+    def __init__(self, parent, endpoint, extension, distance):
+        self.parent = parent
+        self.endpoint = endpoint
+        self.extension = extension
+        self.distance = distance
+        self.views = None  # (connections, distances, distances_reverse)
+        self.str = None
+
+        if parent is None:  # extension is the identity
+            self.length = 1
+            self.hash = hash(extension) & _BODY_HASH_MASK
+        else:
+            self.length = parent.length + 1
+            self.hash = (parent.hash + _connection_hash(endpoint, extension))\
+                    & _BODY_HASH_MASK
+
+    def pairs(self):
+        """ Return the connections of the chain as (endpoint, extension)
+        pairs of hashes
+        """
+        pairs = set()
+        node = self
+        while node.parent is not None:
+            pairs.add((hash(node.endpoint), hash(node.extension)))
+            node = node.parent
+
+        return pairs
+
+    def distance_of(self, assertion):
+        if self.views is not None:
+            return self.views[2].get(hash(assertion))
+
+        node = self
+        while node is not None:
+            if node.extension is assertion or\
+               hash(node.extension) == hash(assertion):
+                return node.distance
+            node = node.parent
+
+        return None
+
+    def materialize(self):
+        if self.views is None:
+            nodes = list()
+            node = self
+            while node is not None:
+                nodes.append(node)
+                node = node.parent
+
+            identity = nodes.pop().extension
+            connections = {hash(identity): set()}
+            distances = {0: {identity}}
+            distances_reverse = {hash(identity): 0}
+            for node in reversed(nodes):
+                connections[hash(node.endpoint)].add(node.extension)
+                connections[hash(node.extension)] = set()  # Assertion instances have unique hashes
+
+                distances_reverse[hash(node.extension)] = node.distance
+                if node.distance not in distances.keys():
+                    distances[node.distance] = set()
+                distances[node.distance].add(node.extension)
+
+            self.views = (connections, distances, distances_reverse)
+
+        return self.views
+
+    def __getstate__(self):
+        # views are rebuilt when needed
+        return (self.parent, self.endpoint, self.extension, self.distance,
+                self.length, self.hash)
+
+    def __setstate__(self, state):
+        self.parent, self.endpoint, self.extension, self.distance,\
+                self.length, self.hash = state
+        self.views = None
+        self.str = None
 
 class ClauseBody():
     """ Clause Body class
 
     Holds all assertions of a clause's body (set of constraints) and keeps
     track of the connections and distances (from the root) of these assertions.
+    Bodies are persistent: each points to a chain of immutable nodes, one per
+    extension, which it shares with the bodies it was copied from or to, such
+    that copies and extensions take constant time and memory. Its hash
+    combines those of the identity and of every connection, such that it is
+    independent of the order of extension and can be updated, or anticipated,
+    per extension.
     """
-    connections = None
-    distances = None
-    _distances_reverse = None
     identity = None
-    _hash = None
-    _str = None
+    _node = None
 
     def __init__(self, identity, connections=None, distances=None, distances_reverse=None):
         if not isinstance(identity, Assertion):
             raise TypeError()
 
         self.identity = identity
-        self.connections = connections
-        self.distances = distances
-        self._distances_reverse = distances_reverse
+        self._node = _BodyNode(None, None, identity, 0)
 
-        if self.connections is None:
-            self.connections = {hash(identity): set()}
-            self.distances = {0: {identity}}
-            self._distances_reverse = {hash(identity): 0}
+        if connections is not None:
+            # rebuild the chain by distance, such that endpoints come first
+            for distance in sorted(distances.keys()):
+                for assertion in distances[distance]:
+                    for connection in connections[hash(assertion)]:
+                        self.extend(assertion, connection)
 
-        if identity not in self.connections.keys():
-            self.connections[hash(identity)] = set()
-            self.distances[0].add(identity)
-            self._distances_reverse[hash(identity)] = 0
+    @property
+    def connections(self):
+        return self._node.materialize()[0]
 
-        self._str = self._compute_str()
-        self._hash = self._compute_hash()
+    @property
+    def distances(self):
+        return self._node.materialize()[1]
+
+    @property
+    def _distances_reverse(self):
+        return self._node.materialize()[2]
 
     def extend(self, endpoint, extension):
         if not isinstance(endpoint, Assertion) or\
            not isinstance(extension, Assertion):
             raise TypeError()
 
-        self.connections[hash(endpoint)].add(extension)
-        self.connections[hash(extension)] = set()  # Assertion instances have unique hashes
+        distance = self._node.distance_of(endpoint)
+        if distance is None:
+            raise KeyError(hash(endpoint))
 
-        distance = self._distances_reverse[hash(endpoint)] + 1
-        self._distances_reverse[hash(extension)] = distance
-        if distance not in self.distances.keys():
-            self.distances[hash(distance)] = set()
-        self.distances[hash(distance)].add(extension)
+        self._node = _BodyNode(self._node, endpoint, extension, distance + 1)
 
-        self._str = self._compute_str()
-        self._hash = self._compute_hash()
+    def hash_extended(self, endpoint, extension):
+        """ Return the hash this body would have if extended """
+        return (self._node.hash + _connection_hash(endpoint, extension)) & _BODY_HASH_MASK
 
-    def copy(self):
-        return ClauseBody(connections={k:{v for v in self.connections[k]} for k in self.connections.keys()},
-                           distances={k:{v for v in self.distances[k]} for k in self.distances.keys()},
-                           distances_reverse={k:v for k,v in self._distances_reverse.items()},
-                           identity=self.identity)
+    def is_extension_of(self, body, endpoint, extension):
+        """ Return True if this body has the same connections as body
+        extended, regardless of their order
+        """
+        if hash(self.identity) != hash(body.identity)\
+           or len(self) != len(body) + 1:
+            return False
 
-    def __hash__(self):
-        return self._hash
+        pairs = body._node.pairs()
+        pairs.add((hash(endpoint), hash(extension)))
 
-    def _compute_hash(self):
-        # order invariant
-        value = str(self.__class__.__name__) + str(self.identity) + str(self)
+        return self._node.pairs() == pairs
 
-        return hash(value)
+    def copy(self):
+        body = ClauseBody.__new__(ClauseBody)
+        body.identity = self.identity
+        body._node = self._node
+
+        return body
+
+    def __hash__(self):
+        return self._node.hash
 
     def __len__(self):
-        return len(self.connections.keys())
+        return self._node.length
 
     def __lt__(self, other):
         if len(self) < len(other):
@@ -432,14 +627,16 @@ class ClauseBody():
         return "BODY [{}]".format(str(self))
 
     def __str__(self):
-        return self._str
+        if self._node.str is None:
+            self._node.str = self._compute_str()
+
+        return self._node.str
 
     def _compute_str(self):
         return "{" + "; ".join([str(assertion) for connections in
                                 sorted(self.connections.values())
                                 for assertion in connections]) + "}"
 
-
 class GenerationForest():
     """ Generation Forest class
 
@@ -494,7 +691,7 @@ class GenerationForest():
         self._trees[ctype].clear(depth)
 
     def plant(self, ctype, tree):
-        if type(tree) is not GenerationTree:
+        if not isinstance(tree, GenerationTree):
             raise TypeError()
 
         self._trees[ctype] = tree
@@ -587,3 +784,342 @@ class GenerationTree():
 
     def __str__(self):
         return "{}:{}".format(self.height, self.size)
+
+
+class ColumnarGenerationTree(GenerationTree):
+    """ Columnar Generation Tree class
+
+    Generation tree which stores the clauses of each depth column-wise rather
+    than as Clause instances: scores in NumPy arrays, heads as indices in a
+    table of (shared) heads, bodies as their (shared) chain of nodes, and
+    parents as row indices in the same or previous depth. Clauses are
+    materialized when iterated, and can be pruned or removed by passing those
+    back.
+
+    Domains are only kept for the deepest depth, which is the one still to be
+    explored or reported on. Links to children are not kept.
+    """
+    _heads = None
+    _head_index = None
+
+    def __init__(self):
+        super().__init__()
+        self._heads = list()
+        self._head_index = dict()
+
+    def add(self, clause, depth):
+        self._append(clause, depth)
+        self._link(clause, depth)
+
+    def _append(self, clause, depth):
+        if not isinstance(clause, Clause):
+            raise TypeError()
+        if depth > self.height:
+            raise IndexError("Depth exceeds height of tree")
+        if self.height <= depth:
+            self._new_depth()
+
+        key = hash(clause.head)
+        if key not in self._head_index.keys():
+            self._head_index[key] = len(self._heads)
+            self._heads.append(clause.head)
+
+        columns = self._tree[depth]
+        clause._row = (columns.id, columns.append(clause,
+                                                  self._head_index[key]))
+        self.size += 1
+
+    def _link(self, clause, depth):
+        parent = clause.parent
+        if parent is None or parent._row is None:
+            return
+
+        # parents are either of the previous depth or, if extended more than
+        # once, of the same depth
+        for parent_depth in (depth, depth-1):
+            if parent_depth >= 0 and\
+               parent._row[0] == self._tree[parent_depth].id:
+                self._tree[depth].link(clause._row[1], parent_depth,
+                                       parent._row[1])
+                break
+
+    def rmv(self, clause, depth):
+        if not isinstance(clause, Clause):
+            raise TypeError()
+        if depth >= self.height:
+            raise IndexError("Depth exceeds height of tree")
+        if clause._row is None or clause._row[0] != self._tree[depth].id\
+           or not self._tree[depth].alive(clause._row[1]):
+            raise KeyError(clause)
+
+        self._tree[depth].remove(clause._row[1])
+        self.size -= 1
+
+    def update(self, clauses, depth):
+        if depth > self.height:
+            raise IndexError("Depth exceeds height of tree")
+        if self.height <= depth:
+            self._new_depth()
+
+        if depth > 0:
+            # the previous depth has been explored
+            self._tree[depth-1].release()
+
+        # add all before linking, as parents can be among them
+        clauses = list(clauses)
+        for clause in clauses:
+            self._append(clause, depth)
+        for clause in clauses:
+            self._link(clause, depth)
+
+    def clear(self, depth):
+        if depth >= self.height:
+            raise IndexError("Depth exceeds height of tree")
+
+        self.size -= len(self._tree[depth])
+        self._tree[depth] = _ClauseColumns()
+        if depth+1 < self.height:
+            self._tree[depth+1].orphan(depth)
+
+    def get(self, depth=-1):
+        depths = range(self.height)
+        if depth >= 0:
+            if depth >= self.height:
+                raise IndexError("Depth exceeds height of tree")
+            depths = [depth]
+
+        for depth in depths:
+            parents = dict()  # materialized parents, shared by siblings
+            columns = self._tree[depth]
+            for row in columns.rows():
+                yield self._materialize(depth, row, parents)
+
+    def remap(self, head_map, body_map, extent_map):
+        """ Replace all heads, bodies, and domains by what the given functions
+        return for them
+        """
+        self._heads = [head_map(head) for head in self._heads]
+        self._head_index = {hash(head): i for i, head in enumerate(self._heads)}
+        for columns in self._tree:
+            columns.remap(body_map, extent_map)
+
+    def _new_depth(self):
+        self._tree.append(_ClauseColumns())
+        self.height += 1
+
+    def _materialize(self, depth, row, parents):
+        columns = self._tree[depth]
+
+        parent = None
+        key = (int(columns.parent_depth[row]), int(columns.parent[row]))
+        if key[1] >= 0:
+            if key not in parents.keys():
+                parents[key] = self._materialize(*key, parents)
+            parent = parents[key]
+
+        clause = Clause(head=self._heads[columns.head[row]],
+                        body=_body_of(columns.bodies[row]),
+                        domain_probability=float(columns.domain_probability[row]),
+                        range_probability=float(columns.range_probability[row]),
+                        confidence=int(columns.confidence[row]),
+                        parent=parent)
+        clause.support = int(columns.support[row])
+        clause._prune = bool(columns.prune[row])
+        clause._satisfy_body, clause._satisfy_full, clause._extents,\
+                clause._digest = columns.extents[row]
+        clause._row = (columns.id, row)
+
+        return clause
+
+def _body_of(node):
+    body = ClauseBody.__new__(ClauseBody)
+    body._node = node
+
+    root = node
+    while root.parent is not None:
+        root = root.parent
+    body.identity = root.extension
+
+    return body
+
+
+class _ClauseColumns():
+    """ Clause Columns class
+
+    The clauses of one depth of a ColumnarGenerationTree. Rows are appended to
+    lists first, and moved into arrays when read.
+    """
+    _FIELDS = [('support', np.int64), ('confidence', np.int64),
+               ('domain_probability', np.float64),
+               ('range_probability', np.float64),
+               ('parent', np.int64), ('parent_depth', np.int64),
+               ('head', np.int64), ('prune', bool), ('_alive', bool)]
+
+    def __init__(self):
+        self.id = next(_indices)  # unique across processes, as are assertions
+        for name, dtype in self._FIELDS:
+            setattr(self, name, np.empty(0, dtype=dtype))
+        self.bodies = list()  # nodes
+        self.extents = list()  # (satisfy_body, satisfy_full, extents, digest)
+
+        self._pending = list()
+        self._links = list()
+        self._nalive = 0
+
+    def append(self, clause, head):
+        # without parent until linked
+        self._pending.append((clause.support, clause.confidence,
+                              clause.domain_probability,
+                              clause.range_probability,
+                              -1, -1, head, clause._prune is True, True))
+        self.bodies.append(clause.body._node)
+        self.extents.append((clause._satisfy_body, clause._satisfy_full,
+                             clause._extents, clause._digest))
+        self._nalive += 1
+
+        return len(self.bodies) - 1
+
+    def link(self, row, parent_depth, parent):
+        if row >= len(self.parent):
+            # set when flushed
+            self._links.append((row, parent_depth, parent))
+
+            return
+
+        self.parent[row] = parent
+        self.parent_depth[row] = parent_depth
+
+    def alive(self, row):
+        self._flush()
+        return row < len(self._alive) and self._alive[row]
+
+    def remove(self, row):
+        self._flush()
+        self._alive[row] = False
+        self.extents[row] = (None, None, None, None)
+        self._nalive -= 1
+
+    def rows(self):
+        self._flush()
+        return np.flatnonzero(self._alive)
+
+    def release(self):
+        self.extents = [(None, None, None, digest)
+                        for _, _, _, digest in self.extents]
+
+    def orphan(self, parent_depth):
+        self._flush()
+        self.parent[self.parent_depth == parent_depth] = -1
+
+    def remap(self, body_map, extent_map):
+        self.bodies = [body_map(_body_of(node))._node for node in self.bodies]
+        self.extents = [(extent_map(satisfy_body), extent_map(satisfy_full),
+                         None, digest)
+                        for satisfy_body, satisfy_full, _, digest in self.extents]
+
+    def _flush(self):
+        if len(self._pending) <= 0:
+            return
+
+        columns = list(zip(*self._pending))
+        for (name, dtype), values in zip(self._FIELDS, columns):
+            setattr(self, name, np.concatenate([getattr(self, name),
+                                                np.array(values, dtype=dtype)]))
+        self._pending = list()
+
+        links, self._links = self._links, list()
+        for row, parent_depth, parent in links:
+            self.link(row, parent_depth, parent)
+
+    def __len__(self):
+        return self._nalive
+
+
+class Frontier():
+    """ Frontier class
+
+    Clauses which are yet to be explored, kept in the memory of the process
+    itself. The order in which they are returned is up to the subclass. If
+    maxsize is reached, further clauses are put aside and explored
+    depth-first before any others, such that no more than those of one path
+    of extensions are kept in addition, rather than dropping any.
+    """
+    maxsize = 0
+    _items = None
+    _overflow = None
+
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self._overflow = list()
+
+    def put(self, clause):
+        if self.maxsize > 0 and len(self._items) >= self.maxsize:
+            self._overflow.append(clause)
+
+            return
+
+        self._put(clause)
+
+    def get(self):
+        if len(self._overflow) > 0:
+            return self._overflow.pop()
+
+        return self._get()
+
+    def empty(self):
+        return len(self._items) <= 0 and len(self._overflow) <= 0
+
+    def __len__(self):
+        return len(self._items) + len(self._overflow)
+
+
+class FIFOFrontier(Frontier):
+    """ Breadth-first frontier """
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self._items = deque()
+
+    def _put(self, clause):
+        self._items.append(clause)
+
+    def _get(self):
+        return self._items.popleft()
+
+
+class LIFOFrontier(Frontier):
+    """ Depth-first frontier """
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self._items = deque()
+
+    def _put(self, clause):
+        self._items.append(clause)
+
+    def _get(self):
+        return self._items.pop()
+
+
+class BestFirstFrontier(Frontier):
+    """ Best-first frontier, which returns the clause with the highest
+    confidence first, and the oldest of those if tied
+    """
+    _count = 0
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self._items = list()
+        self._count = 0
+
+    def _put(self, clause):
+        heappush(self._items, (-clause.confidence, self._count, clause))
+        self._count += 1
+
+    def _get(self):
+        return heappop(self._items)[2]
+
+# frontiers by name
+FRONTIERS = {"bfs": FIFOFrontier,
+             "dfs": LIFOFrontier,
+             "best": BestFirstFrontier}
@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import maxsize
+
+from mkgfd.ingest import load_cache
+from mkgfd.sequential import generate
+
+
+# entities with several, partly equivalent, predicate-object pairs, such that
+# bodies are reached in more than one order
+DATASET = os.path.join(os.path.dirname(__file__), "test_synthetic.nt")
+
+def canonical(clause):
+    # connections as (endpoint, extension) pairs, irrespective of order
+    assertions = {hash(assertion): assertion
+                  for level in clause.body.distances.values()
+                  for assertion in level}
+    body = sorted((str(assertions[endpoint]), str(extension))
+                  for endpoint, extensions in clause.body.connections.items()
+                  for extension in extensions)
+
+    return (max(clause.body.distances.keys()), clause.support,
+            clause.confidence, str(clause.head), tuple(body))
+
+class TestGenerate(unittest.TestCase):
+    def generate(self, valprep, prune, **kwargs):
+        cache = load_cache([DATASET])
+        with redirect_stdout(StringIO()):
+            f = generate(cache, range(0, 2), 5, 3, 1.0, 1.0, valprep, prune,
+                         "BB", maxsize, maxsize, False, **kwargs)
+
+        return sorted(canonical(clause) for clause in f.get())
+
+    def test_deterministic(self):
+        for valprep in (False, True):
+            for prune in (False, True):
+                with self.subTest(valprep=valprep, prune=prune):
+                    clauses = self.generate(valprep, prune)
+
+                    self.assertGreater(len(clauses), 0)
+                    self.assertEqual(clauses, self.generate(valprep, prune))
+
+    def test_frontier_size(self):
+        for frontier in ("bfs", "dfs", "best"):
+            with self.subTest(frontier=frontier):
+                clauses = self.generate(True, True, frontier=frontier)
+
+                self.assertEqual(clauses,
+                                 self.generate(True, True, frontier=frontier,
+                                               frontier_size=2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,15 @@ from argparse import ArgumentTypeError
 from datetime import date, datetime, time
 from re import match
 
+import numpy as np
 from rdflib.graph import Literal, URIRef
-from rdflib.namespace import RDF, RDFS, XSD
+from rdflib.namespace import RDFS
 
 from mkgfd.multimodal import XSD_DATEFRAG, XSD_DATETIME, XSD_NUMERIC, XSD_STRING
-from mkgfd.structures import TypeVariable, DataTypeVariable, MultiModalNode, ObjectTypeVariable
+from mkgfd.structures import (ClauseBody, ColumnarGenerationTree,
+                              TypeVariable, DataTypeVariable,
+                              GenerationForest, MultiModalNode,
+                              ObjectTypeVariable)
 from mkgfd.timeutils import gFrag_to_days
 
 
@@ -39,6 +43,28 @@ def cast_xsd(node, dtype):
 
     return node
 
+def cast_xsd_array(nodes, dtype):
+    """ Cast literals of the same data type into an array of values
+
+    Numeric values and date fragments become floats, date times become
+    datetime64 (without timezone), and all others the objects cast_xsd
+    returns. Literals which cannot be cast become NaN or NaT, such that they
+    fall outside every range.
+    """
+    values = [cast_xsd(node, dtype) for node in nodes]
+    if dtype in XSD_NUMERIC or dtype in XSD_DATEFRAG:
+        return np.array([v if isinstance(v, (int, float)) else np.nan
+                         for v in values], dtype=float)
+    if dtype in XSD_DATETIME:
+        return np.array([np.datetime64(v.replace(tzinfo=None), 'us')
+                         if isinstance(v, datetime) else np.datetime64('NaT')
+                         for v in values], dtype='datetime64[us]')
+
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+
+    return array
+
 def generate_label_map(g):
     label_map = DictDefault(str())
     for e, _, l in g.triples((None, RDFS.label, None)):
@@ -46,71 +72,111 @@ def generate_label_map(g):
 
     return label_map
 
-def generate_data_type_map(g):
-    data_type_map = {'object-to-type': DictDefault(None),
-                     'type-to-object': DictDefault(set())}
-    for o in g.objects():
-        if not isinstance(o, Literal):
-            continue
+def predicate_frequency(cache,
+                        assertion,
+                        assertion_domain):
+    return len(assertion_domain & cache.subject_set(assertion.predicate))
+
+def decode_generation_forest(generation_forest, cache):
+    """ Map the IDs in all clauses of a generation forest back onto their RDF
+    terms. Clauses are updated in place, with their links left intact. Extents
+    become sets of RDF terms.
+    """
+    if cache.dictionary is None:
+        return generation_forest
+
+    decoded_forest = GenerationForest()
+    memo = dict()
+    for ctype in generation_forest.types():
+        tree = generation_forest.get_tree(ctype)
+        if isinstance(tree, ColumnarGenerationTree):
+            # heads, bodies, and extents are stored apart from clauses
+            tree.remap(lambda head: decode_assertion(head, cache, memo),
+                       lambda body: decode_clause_body(body, cache, memo),
+                       lambda extent: decode_extent(extent, cache, memo))
+            decoded_forest.plant(cache.decode(ctype), tree)
 
-        dtype = o.datatype
-        if dtype is None:
-            dtype = XSD.string if o.language != None else XSD.anyType
+            continue
 
-        if dtype not in data_type_map.keys():
-            data_type_map['type-to-object'][dtype] = set()
+        for clause in tree.get():
+            decode_clause(clause, cache, memo)
 
-        data_type_map['type-to-object'][dtype].add(o)
-        data_type_map['object-to-type'][o] = dtype
+        decoded_forest.plant(cache.decode(ctype), tree)
 
-    return data_type_map
+    return decoded_forest
 
-def generate_object_type_map(g):
-    object_type_map = {'object-to-type': DictDefault(set()),
-                       'type-to-object': DictDefault(set())}
-    for e in g.subjects():
-        if not isinstance(e, URIRef):
+def decode_clause(clause, cache, memo):
+    # parents and children might have been pruned from the forest
+    pending = [clause]
+    while len(pending) > 0:
+        clause = pending.pop()
+        if id(clause) in memo.keys() or not isinstance(clause.body, ClauseBody):
             continue
+        memo[id(clause)] = clause
 
-        ctypes = list(g.objects(e, RDF.type))
-        if len(ctypes) <= 0:
-            ctypes.append(RDFS.Class)
-        for ctype in ctypes:
-            if ctype not in object_type_map['type-to-object'].keys():
-                object_type_map['type-to-object'][ctype] = set()
-            if e not in object_type_map['object-to-type'].keys():
-                object_type_map['object-to-type'][e] = set()
+        clause.head = decode_assertion(clause.head, cache, memo)
+        clause.body = decode_clause_body(clause.body, cache, memo)
+        clause._satisfy_body = decode_extent(clause._satisfy_body, cache, memo)
+        clause._satisfy_full = decode_extent(clause._satisfy_full, cache, memo)
 
-            object_type_map['type-to-object'][ctype].add(e)
-            object_type_map['object-to-type'][e].add(ctype)
+        if clause.parent is not None:
+            pending.append(clause.parent)
+        pending.extend(clause.children)
 
-    return object_type_map
+def decode_clause_body(body, cache, memo):
+    assertions = {hash(assertion): assertion for assertions in
+                  body.distances.values() for assertion in assertions}
 
-def generate_predicate_map(g):
-    predicate_map = dict()
+    connections = dict()
+    distances_reverse = dict()
+    for key, connected in body.connections.items():
+        assertion = decode_assertion(assertions[key], cache, memo)
 
-    for lhs, predicate, rhs in g.triples((None, None, None)):
-        if predicate not in predicate_map.keys():
-            predicate_map[predicate] = {'forwards': DictDefault(set()),
-                                        'backwards': DictDefault(set())}
+        connections[hash(assertion)] = {decode_assertion(connection, cache, memo)
+                                        for connection in connected}
+        distances_reverse[hash(assertion)] = body._distances_reverse[key]
 
-        if lhs not in predicate_map[predicate]['forwards'].keys():
-            predicate_map[predicate]['forwards'][lhs] = {rhs}
-        else:
-            predicate_map[predicate]['forwards'][lhs].add(rhs)
+    distances = {distance: {decode_assertion(assertion, cache, memo)
+                            for assertion in assertions}
+                 for distance, assertions in body.distances.items()}
 
-        if rhs not in predicate_map[predicate]['backwards'].keys():
-            predicate_map[predicate]['backwards'][rhs] = {lhs}
-        else:
-            predicate_map[predicate]['backwards'][rhs].add(lhs)
+    return ClauseBody(identity=decode_assertion(body.identity, cache, memo),
+                      connections=connections,
+                      distances=distances,
+                      distances_reverse=distances_reverse)
 
-    return predicate_map
+def decode_assertion(assertion, cache, memo):
+    # memo holds on to the original to prevent its ID from being reused
+    if id(assertion) not in memo.keys():
+        # keep identity
+        decoded = type(assertion)(decode_term(assertion.lhs, cache, memo),
+                                  decode_term(assertion.predicate, cache, memo),
+                                  decode_term(assertion.rhs, cache, memo),
+                                  _index=assertion._index)
 
-def predicate_frequency(predicate_map,
-                        assertion,
-                        assertion_domain):
-    return len(assertion_domain &
-               predicate_map[assertion.predicate]['forwards'].keys())
+        memo[id(assertion)] = (assertion, decoded)
+
+    return memo[id(assertion)][1]
+
+def decode_extent(extent, cache, memo):
+    if extent is None:
+        return None
+
+    # extents are often shared
+    if id(extent) not in memo.keys():
+        memo[id(extent)] = (extent, {cache.decode(e) for e in extent})
+
+    return memo[id(extent)][1]
+
+def decode_term(term, cache, memo):
+    if isinstance(term, ObjectTypeVariable):
+        # other type variables have a data type
+        if id(term) not in memo.keys():
+            memo[id(term)] = (term, ObjectTypeVariable(cache.decode(term.type)))
+
+        return memo[id(term)][1]
+
+    return cache.decode(term)
 
 class DictDefault(dict):
     """ DictDefault class
@@ -147,7 +213,7 @@ def isEquivalent(assertionA, assertionB, cache):
 
 def isSameType(resourceA, resourceB, cache):
     if isinstance(resourceA, ObjectTypeVariable):
-        if (type(resourceB) is URIRef and\
+        if (type(cache.decode(resourceB)) is URIRef and\
             resourceB in cache.object_type_map['object-to-type'].keys()):
             for ctype in cache.object_type_map['object-to-type'][resourceB]:
                 if ctype == resourceA.type:
@@ -155,7 +221,7 @@ def isSameType(resourceA, resourceB, cache):
 
     if isinstance(resourceA, DataTypeVariable)\
        or isinstance(resourceA, MultiModalNode):
-        if (type(resourceB) is Literal and\
+        if (type(cache.decode(resourceB)) is Literal and\
             resourceB in cache.data_type_map['object-to-type'].keys() and\
             resourceA.type == cache.data_type_map['object-to-type'][resourceB]):
             return True
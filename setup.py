@@ -14,7 +14,7 @@ setup(name='mkgfd',
       license='GPL3',
       install_requires=[
           "rdflib == 4.2.1",
-          "numpy",
+          "numpy >= 1.24",
           "scipy",
           "scikit-learn",
           "pathos"